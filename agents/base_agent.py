@@ -7,14 +7,27 @@ ensuring consistent interfaces and behavior patterns.
 
 import asyncio
 import logging
+import random
+import time
 from abc import ABC, abstractmethod
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Callable
+from datetime import datetime, timezone
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Any, Callable, Coroutine, Set, Tuple
 from uuid import UUID
 
 from models.task_models import Task, TaskStatus, AgentType, AgentStatus, AgentMessage
 
 
+class _NullCoordinatorConnection:
+    """Coordinator connection used until a real one is set; drops all messages."""
+    
+    async def send_message(self, message: AgentMessage) -> None:
+        return None
+
+
+_NULL_COORDINATOR = _NullCoordinatorConnection()
+
+
 class BaseAgent(ABC):
     """
     Abstract base class for all agents in the multi-agent system.
@@ -23,6 +36,34 @@ class BaseAgent(ABC):
     that all agents must implement.
     """
     
+    __slots__ = (
+        "agent_id",
+        "agent_type",
+        "_capabilities",
+        "_capability_view",
+        "max_concurrent_tasks",
+        "_current_tasks",
+        "_status",
+        "_last_heartbeat_ns",
+        "_performance_metrics",
+        "_performance_metrics_view",
+        "_message_handlers",
+        "_coordinator_connection",
+        "_coordinator_registered",
+        "_background_tasks",
+        "logger",
+    )
+    
+    # One logger per agent class; the agent id travels as record extra
+    _logger = logging.getLogger("agent")
+    
+    # Heartbeat timing, in seconds
+    HEARTBEAT_INTERVAL = 30.0
+    HEARTBEAT_RETRY_DELAY = 5.0
+    HEARTBEAT_JITTER = 1.0
+    # Unchanged beats skipped before a keepalive is sent anyway
+    HEARTBEAT_KEEPALIVE_TICKS = 3
+    
     def __init__(
         self,
         agent_id: str,
@@ -41,21 +82,35 @@ class BaseAgent(ABC):
         """
         self.agent_id = agent_id
         self.agent_type = agent_type
-        self.capabilities = capabilities
+        # Insertion-ordered set: O(1) membership, stable order for status reports
+        self._capabilities: Dict[str, None] = dict.fromkeys(capabilities)
+        self._capability_view: Optional[Tuple[str, ...]] = None
         self.max_concurrent_tasks = max_concurrent_tasks
         
         # State management
-        self._current_tasks: Dict[UUID, Task] = {}
+        # Keyed by task.id.int: int hashing is much cheaper than UUID hashing
+        self._current_tasks: Dict[int, Task] = {}
         self._status = "offline"
-        self._last_heartbeat = datetime.utcnow()
-        self._performance_metrics: Dict[str, Any] = {}
+        self._last_heartbeat_ns = time.time_ns()
+        self._performance_metrics: Dict[str, Any] = {
+            "task_count": 0,
+            "success_count": 0,
+            "total_processing_time": 0.0,
+            "success_rate": 0.0,
+            "average_processing_time": 0.0,
+        }
+        self._performance_metrics_view = MappingProxyType(self._performance_metrics)
         
         # Communication
         self._message_handlers: Dict[str, Callable] = {}
-        self._coordinator_connection: Optional[Any] = None
+        self._coordinator_connection: Any = _NULL_COORDINATOR
+        self._coordinator_registered = False
+        
+        # Background coroutines (heartbeat, task processing) owned by this agent
+        self._background_tasks: Set[asyncio.Task] = set()
         
         # Logging
-        self.logger = logging.getLogger(f"agent.{agent_id}")
+        self.logger = logging.LoggerAdapter(self._logger, {"agent_id": agent_id})
         
         # Register default message handlers
         self._register_default_handlers()
@@ -94,25 +149,31 @@ class BaseAgent(ABC):
     async def start(self) -> None:
         """Start the agent and register with coordinator."""
         self._status = "online"
-        self._last_heartbeat = datetime.utcnow()
-        self.logger.info(f"Agent {self.agent_id} started")
+        self._last_heartbeat_ns = time.time_ns()
+        self.logger.info("Agent %s started", self.agent_id)
         
         # Register with coordinator
-        if self._coordinator_connection:
+        if self._coordinator_registered:
             await self._register_with_coordinator()
         
         # Start heartbeat
-        asyncio.create_task(self._heartbeat_loop())
+        self._spawn(self._heartbeat_loop())
     
     async def stop(self) -> None:
         """Stop the agent gracefully."""
         self._status = "offline"
         
         # Cancel all current tasks
-        for task_id in list(self._current_tasks.keys()):
+        for task_id in [task.id for task in self._current_tasks.values()]:
             await self._cancel_task(task_id)
         
-        self.logger.info(f"Agent {self.agent_id} stopped")
+        # Stop the heartbeat and any in-flight processing, and wait for them
+        background_tasks = list(self._background_tasks)
+        for background_task in background_tasks:
+            background_task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        
+        self.logger.info("Agent %s stopped", self.agent_id)
     
     async def assign_task(self, task: Task) -> bool:
         """
@@ -125,60 +186,64 @@ class BaseAgent(ABC):
             True if task was accepted, False otherwise
         """
         if len(self._current_tasks) >= self.max_concurrent_tasks:
-            self.logger.warning(f"Agent {self.agent_id} at capacity, rejecting task {task.id}")
+            self.logger.warning("Agent %s at capacity, rejecting task %s", self.agent_id, task.id)
             return False
         
         if not await self.validate_task(task):
-            self.logger.warning(f"Agent {self.agent_id} cannot handle task {task.id}")
+            self.logger.warning("Agent %s cannot handle task %s", self.agent_id, task.id)
             return False
         
-        self._current_tasks[task.id] = task
+        self._current_tasks[task.id.int] = task
         task.update_status(TaskStatus.IN_PROGRESS)
         
-        self.logger.info(f"Agent {self.agent_id} accepted task {task.id}")
+        self.logger.info("Agent %s accepted task %s", self.agent_id, task.id)
         
         # Process task asynchronously
-        asyncio.create_task(self._process_task_wrapper(task))
+        self._spawn(self._process_task_wrapper(task))
         
         return True
     
+    def _spawn(self, coro: Coroutine[Any, Any, None]) -> asyncio.Task:
+        """Run a coroutine in the background, tracked until it finishes."""
+        background_task = asyncio.create_task(coro)
+        self._background_tasks.add(background_task)
+        background_task.add_done_callback(self._background_tasks.discard)
+        return background_task
+    
     async def _process_task_wrapper(self, task: Task) -> None:
         """Wrapper for task processing with error handling."""
         try:
-            start_time = datetime.utcnow()
+            start_time = time.perf_counter()
             result = await self.process_task(task)
-            end_time = datetime.utcnow()
+            processing_time = time.perf_counter() - start_time
             
             # Update task with result
             task.result = result
             task.update_status(TaskStatus.COMPLETED)
             
             # Update performance metrics
-            processing_time = (end_time - start_time).total_seconds()
             self._update_performance_metrics(task.id, processing_time, True)
             
-            self.logger.info(f"Task {task.id} completed successfully")
+            self.logger.info("Task %s completed successfully", task.id)
             
         except Exception as e:
-            self.logger.error(f"Task {task.id} failed: {str(e)}")
+            self.logger.error("Task %s failed: %s", task.id, e)
             task.update_status(TaskStatus.FAILED, str(e))
             self._update_performance_metrics(task.id, 0, False)
         
         finally:
             # Remove task from current tasks
-            self._current_tasks.pop(task.id, None)
+            self._current_tasks.pop(task.id.int, None)
             
             # Notify coordinator of completion
-            if self._coordinator_connection:
-                await self._notify_task_completion(task)
+            await self._notify_task_completion(task)
     
     async def _cancel_task(self, task_id: UUID) -> None:
         """Cancel a task."""
-        if task_id in self._current_tasks:
-            task = self._current_tasks[task_id]
+        task = self._current_tasks.pop(task_id.int, None)
+        if task is not None:
             task.update_status(TaskStatus.CANCELLED)
-            self._current_tasks.pop(task_id)
-            self.logger.info(f"Task {task_id} cancelled")
+            self.logger.info("Task %s cancelled", task_id)
     
     def get_status(self) -> AgentStatus:
         """Get current agent status."""
@@ -186,52 +251,63 @@ class BaseAgent(ABC):
             agent_id=self.agent_id,
             agent_type=self.agent_type,
             status=self._status,
-            last_heartbeat=self._last_heartbeat,
-            current_tasks=list(self._current_tasks.keys()),
+            last_heartbeat=datetime.fromtimestamp(self._last_heartbeat_ns / 1e9, tz=timezone.utc),
+            current_tasks=[task.id for task in self._current_tasks.values()],
             capabilities=self.capabilities,
-            performance_metrics=self._performance_metrics.copy()
+            # AgentStatus validation builds its own dict from the read-only view
+            performance_metrics=self._performance_metrics_view
         )
     
     def _update_performance_metrics(self, task_id: UUID, processing_time: float, success: bool) -> None:
         """Update performance metrics."""
-        if "task_count" not in self._performance_metrics:
-            self._performance_metrics["task_count"] = 0
-        if "success_count" not in self._performance_metrics:
-            self._performance_metrics["success_count"] = 0
-        if "total_processing_time" not in self._performance_metrics:
-            self._performance_metrics["total_processing_time"] = 0.0
-        
-        self._performance_metrics["task_count"] += 1
-        self._performance_metrics["total_processing_time"] += processing_time
+        metrics = self._performance_metrics
+        metrics["task_count"] += 1
+        metrics["total_processing_time"] += processing_time
         
         if success:
-            self._performance_metrics["success_count"] += 1
-        
-        # Calculate success rate
-        success_rate = (
-            self._performance_metrics["success_count"] / 
-            self._performance_metrics["task_count"]
-        )
-        self._performance_metrics["success_rate"] = success_rate
+            metrics["success_count"] += 1
         
-        # Calculate average processing time
-        avg_time = (
-            self._performance_metrics["total_processing_time"] / 
-            self._performance_metrics["task_count"]
-        )
-        self._performance_metrics["average_processing_time"] = avg_time
+        # Incremental means: nudge each average by its delta over the new count
+        task_count = metrics["task_count"]
+        metrics["success_rate"] += (success - metrics["success_rate"]) / task_count
+        metrics["average_processing_time"] += (
+            processing_time - metrics["average_processing_time"]
+        ) / task_count
     
     async def _heartbeat_loop(self) -> None:
         """Send periodic heartbeats to coordinator."""
+        loop = asyncio.get_running_loop()
+        
+        # Jitter the first beat so agents started together don't beat in lockstep
+        await asyncio.sleep(random.uniform(0, self.HEARTBEAT_JITTER))
+        next_tick = loop.time()
+        last_sent_state = None
+        unchanged_ticks = 0
+        
         while self._status == "online":
             try:
-                self._last_heartbeat = datetime.utcnow()
-                if self._coordinator_connection:
+                self._last_heartbeat_ns = time.time_ns()
+                
+                # Coalesce: only send when state changed, plus a periodic keepalive
+                state = (self._status, len(self._current_tasks))
+                if state != last_sent_state or unchanged_ticks >= self.HEARTBEAT_KEEPALIVE_TICKS:
                     await self._send_heartbeat()
-                await asyncio.sleep(30)  # Heartbeat every 30 seconds
+                    last_sent_state = state
+                    unchanged_ticks = 0
+                else:
+                    unchanged_ticks += 1
+                
+                # Schedule from the previous tick rather than from now to avoid drift
+                next_tick += self.HEARTBEAT_INTERVAL
             except Exception as e:
-                self.logger.error(f"Heartbeat failed: {str(e)}")
-                await asyncio.sleep(5)  # Retry in 5 seconds on error
+                self.logger.error("Heartbeat failed: %s", e)
+                next_tick = loop.time() + self.HEARTBEAT_RETRY_DELAY
+            
+            now = loop.time()
+            if next_tick <= now:
+                # Fell behind (e.g. a blocked loop); skip missed beats instead of bursting
+                next_tick = now + self.HEARTBEAT_INTERVAL
+            await asyncio.sleep(next_tick - now)
     
     def _register_default_handlers(self) -> None:
         """Register default message handlers."""
@@ -242,7 +318,7 @@ class BaseAgent(ABC):
     
     async def _handle_heartbeat(self, message: AgentMessage) -> None:
         """Handle heartbeat message."""
-        self._last_heartbeat = datetime.utcnow()
+        self._last_heartbeat_ns = time.time_ns()
     
     async def _handle_task_assignment(self, message: AgentMessage) -> None:
         """Handle task assignment message."""
@@ -257,9 +333,9 @@ class BaseAgent(ABC):
     async def _handle_status_request(self, message: AgentMessage) -> None:
         """Handle status request message."""
         # Send status back to coordinator
-        if self._coordinator_connection:
+        if self._coordinator_registered:
             status = self.get_status()
-            await self._send_message("coordinator", "status_response", {"status": status.dict()})
+            await self._send_message("coordinator", "status_response", {"status": status.model_dump(mode="json")})
     
     async def _register_with_coordinator(self) -> None:
         """Register this agent with the coordinator."""
@@ -268,11 +344,11 @@ class BaseAgent(ABC):
     
     async def _notify_task_completion(self, task: Task) -> None:
         """Notify coordinator of task completion."""
-        if self._coordinator_connection:
+        if self._coordinator_registered:
             await self._send_message(
                 "coordinator",
                 "task_completion",
-                {"task": task.dict()},
+                {"task": task.model_dump(mode="json")},
                 task.id
             )
     
@@ -288,31 +364,73 @@ class BaseAgent(ABC):
         task_id: Optional[UUID] = None
     ) -> None:
         """Send a message to another agent or coordinator."""
-        if self._coordinator_connection:
-            message = AgentMessage(
-                sender=self.agent_id,
-                recipient=recipient,
-                message_type=message_type,
-                payload=payload,
-                task_id=task_id
-            )
-            await self._coordinator_connection.send_message(message)
+        # Skip building the message entirely when nobody would receive it
+        if not self._coordinator_registered:
+            return
+        
+        # Every field is produced by the agent itself, so skip re-validation
+        message = AgentMessage.model_construct(
+            sender=self.agent_id,
+            recipient=recipient,
+            message_type=message_type,
+            payload=payload,
+            task_id=task_id
+        )
+        await self._coordinator_connection.send_message(message)
     
     def set_coordinator_connection(self, connection: Any) -> None:
-        """Set the coordinator connection."""
-        self._coordinator_connection = connection
+        """Set the coordinator connection, or None to disconnect."""
+        if connection is None:
+            self._coordinator_connection = _NULL_COORDINATOR
+            self._coordinator_registered = False
+        else:
+            self._coordinator_connection = connection
+            self._coordinator_registered = True
+    
+    @property
+    def capabilities(self) -> Tuple[str, ...]:
+        """Capabilities this agent provides, in registration order."""
+        if self._capability_view is None:
+            self._capability_view = tuple(self._capabilities)
+        return self._capability_view
+    
+    def has_capabilities(self, required: Iterable[str]) -> bool:
+        """Check if this agent provides every capability in required."""
+        return self._capabilities.keys() >= frozenset(required)
+    
+    def capability_match(self, required: Iterable[str]) -> float:
+        """
+        Score how well this agent covers a set of required capabilities.
+        
+        Args:
+            required: Capabilities needed by a task
+            
+        Returns:
+            Fraction of required capabilities this agent provides (0.0 - 1.0)
+        """
+        required = frozenset(required)
+        if not required:
+            return 1.0
+        return len(self._capabilities.keys() & required) / len(required)
     
     def add_capability(self, capability: str) -> None:
         """Add a new capability to this agent."""
-        if capability not in self.capabilities:
-            self.capabilities.append(capability)
-            self.logger.info(f"Added capability: {capability}")
+        if capability not in self._capabilities:
+            self._capabilities[capability] = None
+            self._capability_view = None
+            self.logger.info("Added capability: %s", capability)
     
     def remove_capability(self, capability: str) -> None:
         """Remove a capability from this agent."""
-        if capability in self.capabilities:
-            self.capabilities.remove(capability)
-            self.logger.info(f"Removed capability: {capability}")
+        if capability in self._capabilities:
+            del self._capabilities[capability]
+            self._capability_view = None
+            self.logger.info("Removed capability: %s", capability)
+    
+    @property
+    def performance_metrics(self) -> Mapping[str, Any]:
+        """Read-only view of this agent's performance metrics."""
+        return self._performance_metrics_view
     
     @property
     def is_available(self) -> bool:
@@ -5,15 +5,41 @@ This agent specializes in processing images and generating collages
 using various layout algorithms and customization options.
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Any
+import os
+from functools import partial
+from typing import Dict, List, Any, Optional
 from uuid import UUID
 
 from agents.base_agent import BaseAgent
-from models.task_models import Task, TaskStatus, AgentType
+from models.task_models import Task, TaskStatus, AgentType, CollageLayout, ImageInfo
 from models.design_models import DesignRequest, CollageGenerationResult, ProcessingOptions
 from services.collage_generator import CollageGenerator
 from services.image_processor import ImageProcessor
+from utils.executors import get_process_pool
+from utils.layout import grid_dimensions
+
+
+# Capabilities every design task needs, plus the one matching its layout
+_REQUIRED_CAPABILITIES = frozenset({"collage_generation"})
+_LAYOUT_CAPABILITIES = {
+    layout: _REQUIRED_CAPABILITIES | {f"{layout.value}_layout"}
+    for layout in CollageLayout
+}
+
+# Upper bound on image files probed at once while validating a task
+_MAX_CONCURRENT_VALIDATIONS = 8
+
+# Processing options are treated as immutable value objects and shared
+_DEFAULT_PROCESSING_OPTIONS = ProcessingOptions()
+_COLLAGE_PROCESSING_OPTIONS = ProcessingOptions(
+    resize_mode="fit",
+    quality=95,
+    optimize=True,
+    preserve_aspect_ratio=True,
+    max_file_size_mb=10
+)
 
 
 class DesignAgent(BaseAgent):
@@ -27,6 +53,10 @@ class DesignAgent(BaseAgent):
     - Layout arrangement
     """
     
+    __slots__ = ("collage_generator", "image_processor")
+    
+    _logger = logging.getLogger("design_agent")
+    
     def __init__(self, agent_id: str = "design_agent_001"):
         """
         Initialize the design agent.
@@ -57,8 +87,6 @@ class DesignAgent(BaseAgent):
         # Initialize services
         self.collage_generator = CollageGenerator()
         self.image_processor = ImageProcessor()
-        
-        self.logger = logging.getLogger(f"design_agent.{agent_id}")
     
     async def validate_task(self, task: Task) -> bool:
         """
@@ -76,27 +104,66 @@ class DesignAgent(BaseAgent):
         
         # Check if task has images
         if not task.images or len(task.images) == 0:
-            self.logger.warning(f"Task {task.id} has no images")
+            self.logger.warning("Task %s has no images", task.id)
             return False
         
         # Check if task has design specification
         if not task.design_spec:
-            self.logger.warning(f"Task {task.id} has no design specification")
+            self.logger.warning("Task %s has no design specification", task.id)
+            return False
+        
+        # Check if this agent supports the requested layout
+        if not self.has_capabilities(_LAYOUT_CAPABILITIES[task.design_spec.layout]):
+            self.logger.warning(
+                "Task %s requires unsupported layout: %s", task.id, task.design_spec.layout.value
+            )
             return False
         
         # Validate image count (reasonable limits)
         if len(task.images) > 20:
-            self.logger.warning(f"Task {task.id} has too many images: {len(task.images)}")
+            self.logger.warning("Task %s has too many images: %s", task.id, len(task.images))
             return False
         
         # Check if images are valid
-        for image_info in task.images:
-            if not await self.image_processor.validate_image(image_info.file_path):
-                self.logger.warning(f"Task {task.id} has invalid image: {image_info.filename}")
-                return False
+        invalid_image = await self._find_invalid_image(task.images)
+        if invalid_image is not None:
+            self.logger.warning("Task %s has invalid image: %s", task.id, invalid_image.filename)
+            return False
         
         return True
     
+    async def _find_invalid_image(self, images: List[ImageInfo]) -> Optional[ImageInfo]:
+        """
+        Validate images concurrently, stopping at the first invalid one.
+        
+        Args:
+            images: Images to validate
+            
+        Returns:
+            The first image found to be invalid, or None if all are valid
+        """
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_VALIDATIONS)
+        
+        async def check(image_info: ImageInfo):
+            async with semaphore:
+                try:
+                    is_valid = await self.image_processor.validate_image(image_info.file_path)
+                except Exception:
+                    is_valid = False
+                return image_info, is_valid
+        
+        pending = [asyncio.ensure_future(check(image_info)) for image_info in images]
+        try:
+            for next_done in asyncio.as_completed(pending):
+                image_info, is_valid = await next_done
+                if not is_valid:
+                    return image_info
+            return None
+        finally:
+            # Stop probing the remaining images once the outcome is known
+            for future in pending:
+                future.cancel()
+    
     async def process_task(self, task: Task) -> Dict[str, Any]:
         """
         Process a design generation task.
@@ -110,14 +177,18 @@ class DesignAgent(BaseAgent):
         Raises:
             Exception: If task processing fails
         """
-        self.logger.info(f"Processing design task {task.id}")
+        self.logger.info("Processing design task %s", task.id)
         
         try:
             # Create design request from task
             design_request = await self._create_design_request(task)
             
-            # Generate collage
-            result = await self.collage_generator.generate_collage(design_request, task.id)
+            # Generate collage in a worker process so pixel work doesn't block the loop
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                get_process_pool(),
+                partial(self.collage_generator.generate_collage_sync, design_request, task.id)
+            )
             
             # Update task with result
             task.result = {
@@ -128,12 +199,12 @@ class DesignAgent(BaseAgent):
                 "layout_used": result.layout_used.value
             }
             
-            self.logger.info(f"Successfully processed design task {task.id}")
+            self.logger.info("Successfully processed design task %s", task.id)
             
             return task.result
             
         except Exception as e:
-            self.logger.error(f"Failed to process design task {task.id}: {str(e)}")
+            self.logger.error("Failed to process design task %s: %s", task.id, e)
             raise
     
     async def _create_design_request(self, task: Task) -> DesignRequest:
@@ -147,15 +218,6 @@ class DesignAgent(BaseAgent):
             DesignRequest object
         """
         
-        # Create processing options
-        processing_options = ProcessingOptions(
-            resize_mode="fit",
-            quality=95,
-            optimize=True,
-            preserve_aspect_ratio=True,
-            max_file_size_mb=10
-        )
-        
         # Create design request
         design_request = DesignRequest(
             images=task.images,
@@ -164,7 +226,7 @@ class DesignAgent(BaseAgent):
             output_height=task.design_spec.output_height,
             background_color=task.design_spec.background_color,
             spacing=task.design_spec.spacing,
-            processing_options=processing_options
+            processing_options=_COLLAGE_PROCESSING_OPTIONS
         )
         
         return design_request
@@ -176,7 +238,7 @@ class DesignAgent(BaseAgent):
         Returns:
             List of capability strings
         """
-        return self.capabilities.copy()
+        return list(self.capabilities)
     
     async def get_performance_stats(self) -> Dict[str, Any]:
         """
@@ -192,7 +254,7 @@ class DesignAgent(BaseAgent):
             "status": status.status,
             "current_tasks": len(self._current_tasks),
             "max_concurrent_tasks": self.max_concurrent_tasks,
-            "capabilities": self.capabilities,
+            "capabilities": list(self.capabilities),
             "performance_metrics": status.performance_metrics,
             "last_heartbeat": status.last_heartbeat.isoformat()
         }
@@ -207,32 +269,54 @@ class DesignAgent(BaseAgent):
         Returns:
             List of results for each task
         """
-        results = []
-        
-        for task in tasks:
-            try:
-                if await self.validate_task(task):
-                    result = await self.process_task(task)
-                    results.append({
-                        "task_id": task.id,
-                        "success": True,
-                        "result": result
-                    })
-                else:
-                    results.append({
-                        "task_id": task.id,
-                        "success": False,
-                        "error": "Task validation failed"
-                    })
-            except Exception as e:
-                results.append({
-                    "task_id": task.id,
-                    "success": False,
-                    "error": str(e)
-                })
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, task in enumerate(tasks):
+            queue.put_nowait((index, task))
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+        
+        async def worker() -> None:
+            # Each worker pulls the next task as soon as it is free, so one
+            # slow task never holds up the rest of the batch
+            while not queue.empty():
+                index, task = queue.get_nowait()
+                results[index] = await self._process_batch_task(task)
+        
+        num_workers = min(self.max_concurrent_tasks, len(tasks))
+        await asyncio.gather(*(worker() for _ in range(num_workers)))
         
         return results
     
+    async def _process_batch_task(self, task: Task) -> Dict[str, Any]:
+        """
+        Validate and process a single task from a batch.
+        
+        Args:
+            task: The task to process
+            
+        Returns:
+            Result entry for the batch
+        """
+        try:
+            if await self.validate_task(task):
+                result = await self.process_task(task)
+                return {
+                    "task_id": task.id,
+                    "success": True,
+                    "result": result
+                }
+            return {
+                "task_id": task.id,
+                "success": False,
+                "error": "Task validation failed"
+            }
+        except Exception as e:
+            return {
+                "task_id": task.id,
+                "success": False,
+                "error": str(e)
+            }
+    
     async def optimize_images_for_collage(
         self,
         images: List[Any],
@@ -250,31 +334,34 @@ class DesignAgent(BaseAgent):
         Returns:
             List of optimized images
         """
-        optimized_images = []
+        # Determine optimal size based on layout
+        size_fn = _SIZE_FNS.get(layout_type)
+        optimal_size = size_fn(self, target_size, len(images)) if size_fn else target_size
         
-        for image_info in images:
-            try:
-                # Determine optimal size based on layout
-                if layout_type == "grid":
-                    optimal_size = self._calculate_grid_image_size(target_size, len(images))
-                elif layout_type == "stacked":
-                    optimal_size = self._calculate_stacked_image_size(target_size, len(images))
-                else:
-                    optimal_size = target_size
-                
-                # Process image
-                result = await self.image_processor.process_image(
+        # Bound the number of images held in memory at once
+        semaphore = asyncio.Semaphore(os.cpu_count() or 1)
+        
+        async def optimize(image_info: Any) -> Any:
+            async with semaphore:
+                return await self.image_processor.process_image(
                     image_info,
-                    ProcessingOptions(),
+                    _DEFAULT_PROCESSING_OPTIONS,
                     optimal_size
                 )
-                
-                optimized_images.append(result.processed_image)
-                
-            except Exception as e:
-                self.logger.warning(f"Failed to optimize image {image_info.id}: {str(e)}")
+        
+        results = await asyncio.gather(
+            *(optimize(image_info) for image_info in images),
+            return_exceptions=True
+        )
+        
+        optimized_images = []
+        for image_info, result in zip(images, results):
+            if isinstance(result, Exception):
+                self.logger.warning("Failed to optimize image %s: %s", image_info.id, result)
                 # Use original image if optimization fails
                 optimized_images.append(image_info)
+            else:
+                optimized_images.append(result.processed_image)
         
         return optimized_images
     
@@ -289,13 +376,10 @@ class DesignAgent(BaseAgent):
         Returns:
             Optimal image size (width, height)
         """
-        import math
-        
         canvas_width, canvas_height = canvas_size
         
         # Calculate grid dimensions
-        cols = int(math.ceil(math.sqrt(num_images)))
-        rows = int(math.ceil(num_images / cols))
+        cols, rows = grid_dimensions(num_images)
         
         # Calculate cell size
         cell_width = canvas_width // cols
@@ -325,7 +409,8 @@ class DesignAgent(BaseAgent):
         self,
         images: List[Any],
         layout_type: str,
-        canvas_size: tuple
+        canvas_size: tuple,
+        columnar: bool = False
     ) -> Dict[str, Any]:
         """
         Generate a preview of how images would be arranged.
@@ -334,6 +419,8 @@ class DesignAgent(BaseAgent):
             images: List of images
             layout_type: Type of layout
             canvas_size: Canvas size
+            columnar: Return positions as parallel "xs"/"ys" lists with a
+                shared cell size instead of one dictionary per image
             
         Returns:
             Preview information
@@ -342,18 +429,14 @@ class DesignAgent(BaseAgent):
             "layout_type": layout_type,
             "canvas_size": canvas_size,
             "num_images": len(images),
-            "image_positions": [],
+            "image_positions": {"xs": [], "ys": []} if columnar else [],
             "estimated_processing_time": 0
         }
         
-        if layout_type == "grid":
-            preview_info["image_positions"] = self._calculate_grid_positions(
-                images, canvas_size
-            )
-        elif layout_type == "stacked":
-            preview_info["image_positions"] = self._calculate_stacked_positions(
-                images, canvas_size
-            )
+        columns_fn = _COLUMN_FNS.get(layout_type)
+        if columns_fn is not None:
+            columns = columns_fn(self, images, canvas_size)
+            preview_info["image_positions"] = columns if columnar else _position_rows(columns)
         
         # Estimate processing time
         preview_info["estimated_processing_time"] = len(images) * 0.5  # 0.5 seconds per image
@@ -362,52 +445,59 @@ class DesignAgent(BaseAgent):
     
     def _calculate_grid_positions(self, images: List[Any], canvas_size: tuple) -> List[Dict[str, Any]]:
         """Calculate positions for grid layout."""
-        import math
-        
-        positions = []
+        return _position_rows(self._calculate_grid_columns(images, canvas_size))
+    
+    def _calculate_stacked_positions(self, images: List[Any], canvas_size: tuple) -> List[Dict[str, Any]]:
+        """Calculate positions for stacked layout."""
+        return _position_rows(self._calculate_stacked_columns(images, canvas_size))
+    
+    def _calculate_grid_columns(self, images: List[Any], canvas_size: tuple) -> Dict[str, Any]:
+        """Calculate grid layout positions as parallel coordinate lists."""
         canvas_width, canvas_height = canvas_size
         num_images = len(images)
         
-        cols = int(math.ceil(math.sqrt(num_images)))
-        rows = int(math.ceil(num_images / cols))
+        cols, rows = grid_dimensions(num_images)
         
         cell_width = canvas_width // cols
         cell_height = canvas_height // rows
         
-        for i in range(num_images):
-            row = i // cols
-            col = i % cols
-            
-            x = col * cell_width
-            y = row * cell_height
-            
-            positions.append({
-                "image_index": i,
-                "x": x,
-                "y": y,
-                "width": cell_width,
-                "height": cell_height
-            })
-        
-        return positions
+        return {
+            "xs": [(i % cols) * cell_width for i in range(num_images)],
+            "ys": [(i // cols) * cell_height for i in range(num_images)],
+            "width": cell_width,
+            "height": cell_height
+        }
     
-    def _calculate_stacked_positions(self, images: List[Any], canvas_size: tuple) -> List[Dict[str, Any]]:
-        """Calculate positions for stacked layout."""
-        positions = []
+    def _calculate_stacked_columns(self, images: List[Any], canvas_size: tuple) -> Dict[str, Any]:
+        """Calculate stacked layout positions as parallel coordinate lists."""
         canvas_width, canvas_height = canvas_size
         num_images = len(images)
         
         image_height = canvas_height // num_images
         
-        for i in range(num_images):
-            y = i * image_height
-            
-            positions.append({
-                "image_index": i,
-                "x": 0,
-                "y": y,
-                "width": canvas_width,
-                "height": image_height
-            })
-        
-        return positions
+        return {
+            "xs": [0] * num_images,
+            "ys": [i * image_height for i in range(num_images)],
+            "width": canvas_width,
+            "height": image_height
+        }
+
+
+def _position_rows(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand parallel coordinate lists into one position dictionary per image."""
+    width, height = columns["width"], columns["height"]
+    return [
+        {"image_index": i, "x": x, "y": y, "width": width, "height": height}
+        for i, (x, y) in enumerate(zip(columns["xs"], columns["ys"]))
+    ]
+
+
+# Layout dispatch tables; layouts without an entry keep the defaults
+_COLUMN_FNS = {
+    "grid": DesignAgent._calculate_grid_columns,
+    "stacked": DesignAgent._calculate_stacked_columns,
+}
+_SIZE_FNS = {
+    "grid": DesignAgent._calculate_grid_image_size,
+    "stacked": DesignAgent._calculate_stacked_image_size,
+}
@@ -5,80 +5,191 @@ This module provides REST API endpoints for image upload,
 design generation, and system management.
 """
 
+import asyncio
 import os
 import logging
-from typing import List, Optional, Dict, Any
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Optional, Any, Tuple
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, BackgroundTasks
-from fastapi.responses import FileResponse
-from fastapi.security import HTTPBearer
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import ValidationError
 
 from models.task_models import (
     Task, TaskStatus, AgentType, TaskPriority, 
-    UploadResponse, TaskResponse, ImageInfo, DesignSpecification
+    UploadResponse, TaskResponse, TaskListResponse, ImageInfo, DesignSpecification
 )
 from models.design_models import (
     DesignRequest, CollageLayout,
-    ProcessingOptions, CollageGenerationResult
+    ProcessingOptions, CollageGenerationResult, IMAGES_ADAPTER
 )
 from services.file_manager import FileManager
-from services.image_processor import ImageProcessor
-from services.collage_generator import CollageGenerator
-from agents.design_agent import DesignAgent
+from services.task_store import create_task_store
 from config.settings import settings, file_config
+from utils.caching import async_ttl_cache
+from utils.colors import HEX_COLOR_PATTERN
+
+logger = logging.getLogger("api")
 
 # Initialize router
 router = APIRouter(prefix="/api/v1", tags=["design-system"])
 
-# Initialize services
-file_manager = FileManager(
-    upload_directory=settings.upload_directory,
-    max_file_size_mb=settings.max_file_size_mb,
-    allowed_extensions=settings.allowed_extensions
-)
 
-image_processor = ImageProcessor()
-collage_generator = CollageGenerator()
+@lru_cache(maxsize=1)
+def get_file_manager() -> FileManager:
+    """
+    Build the shared file manager on first use.
+    
+    Returns:
+        FileManager bound to the configured upload directory
+    """
+    return FileManager(
+        upload_directory=settings.upload_directory,
+        max_file_size_mb=settings.max_file_size_mb,
+        allowed_extensions=settings.allowed_extensions
+    )
+
+
+# Design agents and the queue feeding them (set up by main.py)
+design_agents: List[Any] = []
+design_queue: Optional[asyncio.Queue] = None
+
+
+def start_design_workers(agents: List[Any], queue_size: int) -> List[asyncio.Task]:
+    """
+    Create the shared design queue and start one consumer per agent.
+    
+    Args:
+        agents: Started design agents
+        queue_size: Maximum number of tasks waiting for an agent
+        
+    Returns:
+        The consumer tasks, to be cancelled on shutdown
+    """
+    global design_agents, design_queue
+    design_agents = agents
+    design_queue = asyncio.Queue(maxsize=queue_size)
+    return [asyncio.create_task(design_worker(agent, design_queue)) for agent in agents]
+
+
+async def design_worker(agent, queue: asyncio.Queue):
+    """
+    Process queued design tasks one at a time with the given agent.
+    
+    Args:
+        agent: Design agent that renders the tasks
+        queue: Shared queue of task IDs
+    """
+    while True:
+        task_id = await queue.get()
+        try:
+            await process_design_task(task_id, agent)
+        finally:
+            queue.task_done()
+
+
+async def enqueue_design_task(task: Task) -> None:
+    """
+    Hand a stored task to the design agents.
+    
+    Args:
+        task: Task to process
+        
+    Raises:
+        HTTPException: 503 if no agents are running or the queue is full
+    """
+    if design_queue is not None:
+        try:
+            design_queue.put_nowait(task.id)
+            return
+        except asyncio.QueueFull:
+            pass
+    
+    task.update_status(TaskStatus.FAILED, "Design agents are busy")
+    await task_store.save(task)
+    raise HTTPException(
+        status_code=503,
+        detail="Design agents are busy, try again later",
+        headers={"Retry-After": "5"}
+    )
 
-# Global design agent reference (will be set by main.py)
-global_design_agent = None
 
-def set_design_agent(agent):
-    """Set the global design agent reference."""
-    global global_design_agent
-    global_design_agent = agent
+# Task storage (Redis when REDIS_URL is set, otherwise in-process)
+task_store = create_task_store(
+    settings.redis_url,
+    max_tasks=settings.max_stored_tasks,
+    retention_seconds=settings.task_retention_seconds,
+    max_connections=settings.max_concurrent_tasks_per_agent * 2
+)
 
-# Security
-security = HTTPBearer()
 
-# In-memory task storage (replace with database in production)
-task_storage: Dict[UUID, Task] = {}
+# Health payload never changes while the process runs
+_HEALTH_RESPONSE = {
+    "status": "healthy",
+    "version": settings.app_version,
+    "service": "multi-agent-design-system"
+}
 
 
 @router.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "version": settings.app_version,
-        "service": "multi-agent-design-system"
-    }
+    return _HEALTH_RESPONSE
+
+
+# Upload limits
+MAX_FILES_PER_UPLOAD = 20
+MAX_UPLOAD_BYTES = settings.max_file_size_mb * 1024 * 1024 * MAX_FILES_PER_UPLOAD
 
+# Allowance for multipart boundaries, part headers and form fields
+_MULTIPART_OVERHEAD_BYTES = 1024 * 1024
 
-@router.post("/upload/images", response_model=UploadResponse)
+
+async def enforce_upload_quota(request: Request) -> None:
+    """
+    Reject uploads whose declared Content-Length exceeds the request limit.
+    
+    Args:
+        request: Incoming request
+        
+    Raises:
+        HTTPException: If the declared body size is too large
+    """
+    content_length = request.headers.get("content-length")
+    if (
+        content_length is not None
+        and content_length.isdigit()
+        and int(content_length) > MAX_UPLOAD_BYTES + _MULTIPART_OVERHEAD_BYTES
+    ):
+        raise HTTPException(status_code=413, detail="Upload too large")
+
+
+@router.post(
+    "/upload/images",
+    response_model=UploadResponse,
+    dependencies=[Depends(enforce_upload_quota)]
+)
 async def upload_images(
     files: List[UploadFile] = File(...),
     user_id: Optional[str] = Form(None),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    create_task: bool = Form(True),
+    file_manager: FileManager = Depends(get_file_manager)
 ):
     """
     Upload multiple images for design generation.
     
+    Clients uploading many files over several parallel requests can pass
+    create_task=false and then submit the combined images to
+    /design/generate once every request has finished.
+    
     Args:
         files: List of image files to upload
         user_id: Optional user ID for organization
-        background_tasks: Background task handler
+        create_task: Whether to start design generation for these images
+        file_manager: File manager used to store the uploads
         
     Returns:
         UploadResponse with uploaded image information
@@ -87,8 +198,25 @@ async def upload_images(
         if not files:
             raise HTTPException(status_code=400, detail="No files provided")
         
-        if len(files) > 20:
-            raise HTTPException(status_code=400, detail="Too many files. Maximum 20 files allowed.")
+        if len(files) > MAX_FILES_PER_UPLOAD:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too many files. Maximum {MAX_FILES_PER_UPLOAD} files allowed."
+            )
+        
+        # Check declared sizes and types before any file is written
+        if sum(file.size or 0 for file in files) > MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Upload too large")
+        
+        rejected = [
+            file.filename for file in files
+            if not file_manager.is_allowed_content_type(file.content_type)
+        ]
+        if rejected:
+            raise HTTPException(
+                status_code=415,
+                detail=f"Unsupported file type: {', '.join(rejected)}"
+            )
         
         # Save uploaded files
         uploaded_images = await file_manager.save_multiple_files(files, user_id)
@@ -96,6 +224,13 @@ async def upload_images(
         if not uploaded_images:
             raise HTTPException(status_code=400, detail="No valid images were uploaded")
         
+        if not create_task:
+            return UploadResponse(
+                success=True,
+                message=f"Successfully uploaded {len(uploaded_images)} images",
+                uploaded_images=uploaded_images
+            )
+        
         # Create task for design generation
         task = Task(
             agent_type=AgentType.DESIGN,
@@ -106,10 +241,10 @@ async def upload_images(
         )
         
         # Store task
-        task_storage[task.id] = task
+        await task_store.save(task)
         
-        # Schedule background processing
-        background_tasks.add_task(process_design_task, task.id)
+        # Queue for the design agents
+        await enqueue_design_task(task)
         
         return UploadResponse(
             success=True,
@@ -118,57 +253,101 @@ async def upload_images(
             task_id=task.id
         )
         
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logging.error(f"Upload failed: {str(e)}")
+        logger.exception("Upload failed: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
-@router.post("/design/generate", response_model=TaskResponse)
+async def read_images_body(request: Request) -> List[ImageInfo]:
+    """
+    Validate a JSON array of images straight from the raw request body.
+    
+    Parsing and validation both happen in pydantic-core in one pass,
+    skipping the intermediate Python objects json.loads would build.
+    
+    Args:
+        request: Incoming request
+        
+    Returns:
+        Validated list of images
+    """
+    try:
+        return IMAGES_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+
+# The body is read by read_images_body, so its schema is documented by hand
+_IMAGES_BODY_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/ImageInfo"}}
+            }
+        }
+    }
+}
+
+
+@router.post("/design/generate", response_model=TaskResponse, openapi_extra=_IMAGES_BODY_OPENAPI)
 async def generate_design(
-    images: List[ImageInfo],
     layout: CollageLayout = CollageLayout.GRID,
     output_width: int = 1024,
     output_height: int = 1024,
-    background_color: str = "#FFFFFF",
+    background_color: str = Query("#FFFFFF", pattern=HEX_COLOR_PATTERN),
     spacing: int = 10,
     user_id: Optional[str] = None,
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    images: List[ImageInfo] = Depends(read_images_body),
+    file_manager: FileManager = Depends(get_file_manager)
 ):
     """
     Generate a design with specific parameters.
     
     Args:
-        images: List of images to use
         layout: Collage layout type
         output_width: Output width in pixels
         output_height: Output height in pixels
-        background_color: Background color (hex)
+        background_color: Background color as #RRGGBB
         spacing: Spacing between images
         user_id: Optional user ID
-        background_tasks: Background task handler
+        images: List of images to use
+        file_manager: File manager used to check the source images
         
     Returns:
         TaskResponse with task information
     """
     try:
-        # Validate images exist
-        for image_info in images:
-            if not await file_manager.file_exists(image_info.file_path):
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Image not found: {image_info.filename}"
-                )
-        
-        # Create design specification
-        design_spec = DesignSpecification(
-            layout=layout,
-            output_width=output_width,
-            output_height=output_height,
-            background_color=background_color,
-            spacing=spacing
+        # Validate images exist, checking all files concurrently
+        exists = await asyncio.gather(
+            *(file_manager.file_exists(image_info.file_path) for image_info in images)
         )
+        missing = [image_info.filename for image_info, found in zip(images, exists) if not found]
+        if missing:
+            raise HTTPException(
+                status_code=404, 
+                detail=f"Image not found: {', '.join(missing)}"
+            )
+        
+        # Create design specification; out-of-range values are the client's error
+        try:
+            design_spec = DesignSpecification(
+                layout=layout,
+                output_width=output_width,
+                output_height=output_height,
+                background_color=background_color,
+                spacing=spacing
+            )
+        except ValidationError as e:
+            raise RequestValidationError(
+                [{**error, "loc": ("query", *error["loc"])} for error in e.errors(include_url=False)]
+            )
         
         # Create task
         task = Task(
@@ -180,10 +359,10 @@ async def generate_design(
         )
         
         # Store task
-        task_storage[task.id] = task
+        await task_store.save(task)
         
-        # Schedule background processing
-        background_tasks.add_task(process_design_task, task.id)
+        # Queue for the design agents
+        await enqueue_design_task(task)
         
         return TaskResponse(
             success=True,
@@ -191,52 +370,169 @@ async def generate_design(
             task=task
         )
         
-    except HTTPException:
+    except (HTTPException, RequestValidationError):
         raise
     except Exception as e:
-        logging.error(f"Design generation failed: {str(e)}")
+        logger.exception("Design generation failed: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# Serialized status bodies for recently polled tasks, keyed by task ID
+TASK_STATUS_CACHE_SIZE = 1024
+_task_status_cache: "OrderedDict[UUID, Tuple[str, bytes]]" = OrderedDict()
+
+
+def _task_etag(task: Task) -> str:
+    """
+    Build a weak ETag that changes whenever the task is updated.
+    
+    Args:
+        task: Task to tag
+        
+    Returns:
+        ETag header value
+    """
+    return f'W/"{task.status.value}-{task.updated_at.timestamp():.6f}"'
+
+
 @router.get("/task/{task_id}", response_model=TaskResponse)
-async def get_task_status(task_id: UUID):
+async def get_task_status(task_id: UUID, request: Request):
     """
     Get the status of a task.
     
     Args:
         task_id: Task ID
+        request: Incoming request, checked for If-None-Match
         
     Returns:
-        TaskResponse with task status
+        TaskResponse with task status, or 304 if the client's copy is current
     """
-    if task_id not in task_storage:
+    task = await task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = task_storage[task_id]
+    etag = _task_etag(task)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    cached = _task_status_cache.get(task_id)
+    if cached is not None and cached[0] == etag:
+        _task_status_cache.move_to_end(task_id)
+        body = cached[1]
+    else:
+        body = TaskResponse(
+            success=True,
+            message="Task retrieved successfully",
+            task=task
+        ).model_dump_json().encode()
+        _task_status_cache[task_id] = (etag, body)
+        _task_status_cache.move_to_end(task_id)
+        if len(_task_status_cache) > TASK_STATUS_CACHE_SIZE:
+            _task_status_cache.popitem(last=False)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Seconds between keepalive comments on an idle task event stream
+TASK_EVENTS_KEEPALIVE_SECONDS = 15.0
+
+_TASK_EVENTS_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+
+async def _task_event_stream(task_id: UUID, last_event_id: Optional[str]):
+    """
+    Produce server-sent events for a task's status changes.
+    
+    Args:
+        task_id: Task ID
+        last_event_id: ID of the last event the client saw, if it is reconnecting
+        
+    Yields:
+        Encoded SSE frames
+    """
+    last_status = None
+    async for task in task_store.watch(task_id, idle_timeout=TASK_EVENTS_KEEPALIVE_SECONDS):
+        if task is None:
+            yield ": keepalive\n\n"
+            continue
+        if task.status == last_status:
+            continue
+        last_status = task.status
+        
+        # The event ID is the status, so a reconnecting client isn't sent the one it already has
+        event_id = task.status.value
+        if event_id == last_event_id:
+            continue
+        yield f"id: {event_id}\nevent: status\ndata: {task.model_dump_json()}\n\n"
+
+
+@router.get("/task/{task_id}/events")
+async def stream_task_events(task_id: UUID, request: Request):
+    """
+    Stream task status changes as server-sent events.
+    
+    The current status is sent first, then one event per change; the
+    stream ends once the task completes, fails or is cancelled.
+    
+    Args:
+        task_id: Task ID
+        request: Incoming request, for the Last-Event-ID header
+        
+    Returns:
+        text/event-stream response
+    """
+    if await task_store.get(task_id) is None:
+        raise HTTPException(status_code=404, detail="Task not found")
     
-    return TaskResponse(
-        success=True,
-        message="Task retrieved successfully",
-        task=task
+    return StreamingResponse(
+        _task_event_stream(task_id, request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers=_TASK_EVENTS_HEADERS
     )
 
 
+# Collage files never change once written, so clients may cache them
+_RESULT_CACHE_CONTROL = "private, max-age=3600"
+
+
+class CollageFileResponse(FileResponse):
+    """
+    File response for generated collages.
+    
+    Starlette reads each chunk in a worker thread; collages are a few
+    megabytes at most, so larger chunks mean far fewer thread hand-offs.
+    Servers implementing the ASGI pathsend extension skip the reads and
+    send the file from the kernel instead.
+    """
+    
+    chunk_size = 1024 * 1024
+
+
+def _file_etag(stat_result: os.stat_result) -> str:
+    """Build a strong ETag from a file's modification time and size."""
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
 @router.get("/task/{task_id}/result")
-async def get_task_result(task_id: UUID):
+async def get_task_result(task_id: UUID, request: Request):
     """
     Get the result of a completed task.
     
     Args:
         task_id: Task ID
+        request: Incoming request, checked for If-None-Match
         
     Returns:
         Task result or file download
     """
-    if task_id not in task_storage:
+    task = await task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = task_storage[task_id]
-    
     if task.status != TaskStatus.COMPLETED:
         raise HTTPException(
             status_code=400, 
@@ -248,12 +544,27 @@ async def get_task_result(task_id: UUID):
     
     # Check if result contains file path
     if "output_file_path" in task.result:
+        # Revalidation against the ETag recorded at completion needs no stat
+        etag = task.result.get("etag")
+        if etag is not None and request.headers.get("if-none-match") == etag:
+            return Response(
+                status_code=304,
+                headers={"ETag": etag, "Cache-Control": _RESULT_CACHE_CONTROL}
+            )
+        
         file_path = task.result["output_file_path"]
-        if os.path.exists(file_path):
-            return FileResponse(
+        try:
+            stat_result = os.stat(file_path)
+        except OSError:
+            stat_result = None
+        
+        if stat_result is not None:
+            return CollageFileResponse(
                 file_path,
                 media_type="image/jpeg",
-                filename=f"design_{task_id}.jpg"
+                filename=f"design_{task_id}.jpg",
+                stat_result=stat_result,
+                headers={"ETag": _file_etag(stat_result), "Cache-Control": _RESULT_CACHE_CONTROL}
             )
     
     return task.result
@@ -270,11 +581,10 @@ async def cancel_task(task_id: UUID):
     Returns:
         Success message
     """
-    if task_id not in task_storage:
+    task = await task_store.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    task = task_storage[task_id]
-    
     if task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]:
         raise HTTPException(
             status_code=400, 
@@ -282,16 +592,17 @@ async def cancel_task(task_id: UUID):
         )
     
     task.update_status(TaskStatus.CANCELLED)
+    await task_store.save(task)
     
     return {"message": "Task cancelled successfully"}
 
 
-@router.get("/tasks")
+@router.get("/tasks", response_model=TaskListResponse)
 async def list_tasks(
     user_id: Optional[str] = None,
     status: Optional[TaskStatus] = None,
-    limit: int = 50,
-    offset: int = 0
+    limit: int = Query(50, ge=1),
+    offset: int = Query(0, ge=0)
 ):
     """
     List tasks with optional filtering.
@@ -305,31 +616,24 @@ async def list_tasks(
     Returns:
         List of tasks
     """
-    tasks = list(task_storage.values())
-    
-    # Apply filters
-    if user_id:
-        tasks = [task for task in tasks if task.user_id == user_id]
-    
-    if status:
-        tasks = [task for task in tasks if task.status == status]
-    
-    # Apply pagination
-    tasks = tasks[offset:offset + limit]
+    tasks, total = await task_store.list(user_id, status, limit, offset)
     
     return {
         "tasks": tasks,
-        "total": len(task_storage),
+        "total": total,
         "limit": limit,
         "offset": offset
     }
 
 
 @router.get("/agents/status")
+@async_ttl_cache(ttl_seconds=5)
 async def get_agents_status():
     """
     Get status of all agents.
     
+    Cached for a few seconds since it is polled frequently.
+    
     Returns:
         Agent status information
     """
@@ -344,76 +648,146 @@ async def get_agents_status():
                 "max_concurrent_tasks": design_agent.max_concurrent_tasks,
                 "is_available": design_agent.is_available
             }
-        ]
+            for design_agent in design_agents
+        ],
+        "queued_tasks": design_queue.qsize() if design_queue is not None else 0
     }
 
 
 @router.get("/storage/stats")
+@async_ttl_cache(ttl_seconds=30)
 async def get_storage_stats():
     """
     Get storage statistics.
     
+    Cached for 30 seconds because it walks the upload directory.
+    
     Returns:
         Storage statistics
     """
-    stats = await file_manager.get_storage_stats()
+    stats = await get_file_manager().get_storage_stats()
     return stats
 
 
 @router.post("/storage/cleanup")
-async def cleanup_storage(days_old: int = 7):
+async def cleanup_storage(
+    days_old: int = 7,
+    file_manager: FileManager = Depends(get_file_manager)
+):
     """
     Clean up old files.
     
     Args:
         days_old: Delete files older than this many days
+        file_manager: File manager that owns the upload directory
         
     Returns:
         Cleanup results
     """
     deleted_count = await file_manager.cleanup_old_files(days_old)
+    get_storage_stats.cache_clear()
     return {
         "message": f"Cleaned up {deleted_count} files older than {days_old} days",
         "deleted_count": deleted_count
     }
 
 
-async def process_design_task(task_id: UUID):
+async def process_design_task(task_id: UUID, design_agent):
     """
-    Background task to process design generation.
+    Process a queued design generation task.
     
     Args:
         task_id: Task ID to process
+        design_agent: Agent that renders the task
     """
+    task = None
     try:
-        if task_id not in task_storage:
-            logging.error(f"Task {task_id} not found in storage")
+        task = await task_store.get(task_id)
+        if task is None:
+            logger.error("Task %s not found in storage", task_id)
             return
         
-        task = task_storage[task_id]
-        
-        # Get design agent from global reference
-        if not global_design_agent:
-            logging.error(f"Design agent not available for task {task_id}")
-            task.update_status(TaskStatus.FAILED, "Design agent not available")
+        # Cancelled while waiting in the queue
+        if task.status != TaskStatus.PENDING:
+            logger.info("Skipping task %s with status %s", task_id, task.status)
             return
         
-        design_agent = global_design_agent
-        
         # Validate task
         if not await design_agent.validate_task(task):
+            if await _is_cancelled(task_id):
+                return
             task.update_status(TaskStatus.FAILED, "Task validation failed")
+            await task_store.save(task)
+            return
+        
+        if await _is_cancelled(task_id):
             return
         
-        # Process task
+        # Process task; collage generation itself runs in the shared process pool
+        task.update_status(TaskStatus.IN_PROGRESS)
+        await task_store.save(task)
+        
         result = await design_agent.process_task(task)
+        output_file_path = result.get("output_file_path")
+        
+        # Cancelled while rendering: keep the cancellation and drop the output
+        if await _is_cancelled(task_id):
+            task.result = None
+            if output_file_path:
+                await get_file_manager().delete_file(output_file_path)
+            logger.info("Task %s was cancelled during processing", task_id)
+            return
+        
+        # Record the output's ETag so result revalidation can skip the stat
+        if output_file_path:
+            result["etag"] = _file_etag(await asyncio.to_thread(os.stat, output_file_path))
+        
+        task.result = result
+        task.update_status(TaskStatus.COMPLETED)
+        await task_store.save(task)
         
-        logging.info(f"Task {task_id} completed successfully")
+        logger.info("Task %s completed successfully", task_id)
         
     except Exception as e:
-        logging.error(f"Task {task_id} failed: {str(e)}")
-        if task_id in task_storage:
-            task_storage[task_id].update_status(TaskStatus.FAILED, str(e))
+        logger.exception("Task %s failed: %s", task_id, e)
+        if task is not None and not await _is_cancelled(task_id):
+            task.update_status(TaskStatus.FAILED, str(e))
+            await task_store.save(task)
+
+
+async def _is_cancelled(task_id: UUID) -> bool:
+    """
+    Check whether a task has been cancelled since it was read.
+    
+    Re-reads the task from the store, since with a shared store the
+    cancellation may have come from another worker.
+    
+    Args:
+        task_id: Task ID to check
+        
+    Returns:
+        True if the stored task is cancelled
+    """
+    current = await task_store.get(task_id)
+    return current is not None and current.status == TaskStatus.CANCELLED
+
+
+async def periodic_cleanup(interval_seconds: int):
+    """
+    Background loop that expires old tasks and uploaded files.
+    
+    Args:
+        interval_seconds: Seconds between cleanup runs
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            pruned_tasks = await task_store.prune()
+            deleted_files = await get_file_manager().cleanup_old_files(settings.file_retention_days)
+            get_storage_stats.cache_clear()
+            logger.info("Periodic cleanup removed %s tasks and %s files", pruned_tasks, deleted_files)
+        except Exception as e:
+            logger.exception("Periodic cleanup failed: %s", e)
 
 
 # Error handlers removed - they should be handled at the app level
@@ -5,19 +5,42 @@ This module contains configuration templates for different
 types of agents that can be added to the system.
 """
 
-from typing import Dict, Any, List
+import copy
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping
+
 from models.task_models import AgentType
 
 
+def _freeze(value: Any) -> Any:
+    """Recursively convert dicts to read-only mappings and lists to tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Recursively copy a frozen template back into plain dicts and lists."""
+    if isinstance(value, Mapping):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
 class AgentConfigTemplates:
     """
     Templates for configuring different types of agents.
     """
     
     @staticmethod
-    def get_design_agent_template() -> Dict[str, Any]:
+    @lru_cache(maxsize=1)
+    def get_design_agent_template() -> Mapping[str, Any]:
         """Template for design generation agents."""
-        return {
+        return _freeze({
             "agent_type": AgentType.DESIGN,
             "capabilities": [
                 "collage_generation",
@@ -44,12 +67,13 @@ class AgentConfigTemplates:
                 "supported_layouts": ["grid", "stacked", "circular", "freeform", "mosaic"],
                 "auto_layout_selection": True
             }
-        }
+        })
     
     @staticmethod
-    def get_effects_agent_template() -> Dict[str, Any]:
+    @lru_cache(maxsize=1)
+    def get_effects_agent_template() -> Mapping[str, Any]:
         """Template for effects processing agents (future)."""
-        return {
+        return _freeze({
             "agent_type": AgentType.EFFECTS,
             "capabilities": [
                 "filter_application",
@@ -72,12 +96,13 @@ class AgentConfigTemplates:
                 "advanced": ["style_transfer", "background_removal", "object_detection"],
                 "ai_powered": ["style_transfer", "background_removal"]
             }
-        }
+        })
     
     @staticmethod
-    def get_optimization_agent_template() -> Dict[str, Any]:
+    @lru_cache(maxsize=1)
+    def get_optimization_agent_template() -> Mapping[str, Any]:
         """Template for optimization agents (future)."""
-        return {
+        return _freeze({
             "agent_type": AgentType.OPTIMIZATION,
             "capabilities": [
                 "file_size_optimization",
@@ -100,12 +125,13 @@ class AgentConfigTemplates:
                 "balanced": {"quality": 85, "compression": "medium"},
                 "quality": {"quality": 95, "compression": "low"}
             }
-        }
+        })
     
     @staticmethod
-    def get_huggingface_agent_template() -> Dict[str, Any]:
+    @lru_cache(maxsize=1)
+    def get_huggingface_agent_template() -> Mapping[str, Any]:
         """Template for Hugging Face integration agents (future)."""
-        return {
+        return _freeze({
             "agent_type": "huggingface",
             "capabilities": [
                 "text_to_image",
@@ -136,17 +162,23 @@ class AgentConfigTemplates:
                 "cpu_cores": 4,
                 "ram_gb": 8
             }
-        }
+        })
     
     @staticmethod
-    def get_all_templates() -> Dict[str, Dict[str, Any]]:
-        """Get all available agent templates."""
-        return {
+    @lru_cache(maxsize=1)
+    def get_all_templates() -> Mapping[str, Mapping[str, Any]]:
+        """
+        Get all available agent templates.
+        
+        Templates are built once and returned as read-only mappings;
+        use create_agent_config() to get a mutable copy.
+        """
+        return MappingProxyType({
             "design": AgentConfigTemplates.get_design_agent_template(),
             "effects": AgentConfigTemplates.get_effects_agent_template(),
             "optimization": AgentConfigTemplates.get_optimization_agent_template(),
             "huggingface": AgentConfigTemplates.get_huggingface_agent_template()
-        }
+        })
     
     @staticmethod
     def create_agent_config(agent_type: str, custom_config: Dict[str, Any] = None) -> Dict[str, Any]:
@@ -165,11 +197,12 @@ class AgentConfigTemplates:
         if agent_type not in templates:
             raise ValueError(f"Unknown agent type: {agent_type}")
         
-        config = templates[agent_type].copy()
+        # Templates are shared and read-only; build a private mutable copy
+        config = _thaw(templates[agent_type])
         
         if custom_config:
-            # Deep merge custom config
-            config = AgentConfigTemplates._deep_merge(config, custom_config)
+            # Deep merge custom config into the copy
+            AgentConfigTemplates._merge_into(config, custom_config)
         
         return config
     
@@ -185,15 +218,33 @@ class AgentConfigTemplates:
         Returns:
             Merged dictionary
         """
-        result = base.copy()
-        
-        for key, value in override.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = AgentConfigTemplates._deep_merge(result[key], value)
-            else:
-                result[key] = value
+        if not override:
+            return base.copy()
         
+        result = copy.deepcopy(base)
+        AgentConfigTemplates._merge_into(result, override)
         return result
+    
+    @staticmethod
+    def _merge_into(target: Dict[str, Any], override: Dict[str, Any]) -> None:
+        """
+        Deep merge a dictionary into another in place.
+        
+        Walks nested dictionaries with an explicit stack instead of recursion.
+        
+        Args:
+            target: Dictionary to update
+            override: Override dictionary
+        """
+        stack = [(target, override)]
+        while stack:
+            destination, source = stack.pop()
+            for key, value in source.items():
+                current = destination.get(key)
+                if isinstance(current, dict) and isinstance(value, dict):
+                    stack.append((current, value))
+                else:
+                    destination[key] = value
 
 
 class AgentRegistry:
@@ -5,14 +5,23 @@ This module handles application settings, environment variables,
 and configuration validation.
 """
 
+import atexit
 import os
 import logging
-from typing import Dict, Any, Optional, List
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Any, FrozenSet, Optional, Tuple
 from pathlib import Path
 
 from pydantic_settings import BaseSettings
 from pydantic import Field, validator
 
+from utils.colors import is_hex_color
+
+
+# Image file extensions the system knows how to handle
+SUPPORTED_EXTENSIONS: FrozenSet[str] = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp"})
+
 
 class Settings(BaseSettings):
     """
@@ -29,14 +38,24 @@ class Settings(BaseSettings):
     host: str = Field(default="0.0.0.0", env="HOST")
     port: int = Field(default=8000, env="PORT")
     reload: bool = Field(default=False, env="RELOAD")
+    serve_static: bool = Field(default=False, env="SERVE_STATIC")
+    # uvloop and httptools ship with uvicorn[standard]; use "auto" where they aren't available
+    event_loop: str = Field(default="uvloop", env="EVENT_LOOP")
+    http_protocol: str = Field(default="httptools", env="HTTP_PROTOCOL")
+    # More than one worker process requires REDIS_URL so the workers share tasks
+    workers: int = Field(default=1, ge=1, env="WORKERS")
+    backlog: int = Field(default=2048, env="BACKLOG")
+    limit_concurrency: int = Field(default=1000, env="LIMIT_CONCURRENCY")
+    # Longer than typical client idle times so pooled connections get reused
+    timeout_keep_alive: int = Field(default=75, env="TIMEOUT_KEEP_ALIVE")
     
     # File Management
     upload_directory: str = Field(default="uploads", env="UPLOAD_DIRECTORY")
     processed_directory: str = Field(default="processed_images", env="PROCESSED_DIRECTORY")
     collage_directory: str = Field(default="collages", env="COLLAGE_DIRECTORY")
     max_file_size_mb: int = Field(default=10, env="MAX_FILE_SIZE_MB")
-    allowed_extensions: List[str] = Field(
-        default=[".jpg", ".jpeg", ".png", ".gif", ".webp"],
+    allowed_extensions: FrozenSet[str] = Field(
+        default=SUPPORTED_EXTENSIONS,
         env="ALLOWED_EXTENSIONS"
     )
     
@@ -49,6 +68,9 @@ class Settings(BaseSettings):
     
     # Agent Settings
     max_concurrent_tasks_per_agent: int = Field(default=3, env="MAX_CONCURRENT_TASKS_PER_AGENT")
+    # Design agents consuming the shared queue; each renders one collage at a time
+    design_agent_count: int = Field(default_factory=lambda: os.cpu_count() or 1, ge=1, env="DESIGN_AGENT_COUNT")
+    design_queue_size: int = Field(default=256, ge=1, env="DESIGN_QUEUE_SIZE")
     agent_heartbeat_interval: int = Field(default=30, env="AGENT_HEARTBEAT_INTERVAL")
     task_timeout_seconds: int = Field(default=300, env="TASK_TIMEOUT_SECONDS")
     
@@ -57,6 +79,12 @@ class Settings(BaseSettings):
     task_queue_size: int = Field(default=100, env="TASK_QUEUE_SIZE")
     max_retry_attempts: int = Field(default=3, env="MAX_RETRY_ATTEMPTS")
     
+    # Retention
+    max_stored_tasks: int = Field(default=1000, env="MAX_STORED_TASKS")
+    task_retention_seconds: int = Field(default=3600, env="TASK_RETENTION_SECONDS")
+    file_retention_days: int = Field(default=7, env="FILE_RETENTION_DAYS")
+    cleanup_interval_seconds: int = Field(default=3600, env="CLEANUP_INTERVAL_SECONDS")
+    
     # Database Settings (for future use)
     database_url: Optional[str] = Field(default=None, env="DATABASE_URL")
     
@@ -95,17 +123,26 @@ class Settings(BaseSettings):
             raise ValueError('Image quality must be between 1 and 100')
         return v
     
+    @validator('default_background_color')
+    def validate_background_color(cls, v):
+        # Same rule as DesignSpecification, which the default is copied into
+        if not is_hex_color(v):
+            raise ValueError('Background color must be a #RRGGBB hex string')
+        return v
+    
     @validator('allowed_extensions')
     def validate_extensions(cls, v):
         if isinstance(v, str):
             # Handle comma-separated string from environment
-            v = [ext.strip() for ext in v.split(',')]
+            v = v.split(',')
         
-        valid_extensions = ['.jpg', '.jpeg', '.png', '.gif', '.webp']
-        for ext in v:
-            if ext not in valid_extensions:
-                raise ValueError(f'Extension {ext} not supported. Valid: {valid_extensions}')
-        return v
+        extensions = frozenset(ext.strip().lower() for ext in v)
+        unsupported = extensions - SUPPORTED_EXTENSIONS
+        if unsupported:
+            raise ValueError(
+                f'Extension {min(unsupported)} not supported. Valid: {sorted(SUPPORTED_EXTENSIONS)}'
+            )
+        return extensions
     
     class Config:
         env_file = ".env"
@@ -120,9 +157,21 @@ class AgentConfig:
     
     def __init__(self, settings: Settings):
         self.settings = settings
+        
+        # Settings don't change at runtime, so build the configs once
+        self._design_agent_config = self._build_design_agent_config()
+        self._coordinator_config = self._build_coordinator_config()
     
     def get_design_agent_config(self) -> Dict[str, Any]:
-        """Get configuration for design agent."""
+        """Get configuration for design agent (shared; do not mutate)."""
+        return self._design_agent_config
+    
+    def get_coordinator_config(self) -> Dict[str, Any]:
+        """Get configuration for coordinator (shared; do not mutate)."""
+        return self._coordinator_config
+    
+    def _build_design_agent_config(self) -> Dict[str, Any]:
+        """Build configuration for design agent."""
         return {
             "agent_id": "design_agent_001",
             "agent_type": "design",
@@ -145,8 +194,8 @@ class AgentConfig:
             }
         }
     
-    def get_coordinator_config(self) -> Dict[str, Any]:
-        """Get configuration for coordinator."""
+    def _build_coordinator_config(self) -> Dict[str, Any]:
+        """Build configuration for coordinator."""
         return {
             "coordinator_id": "coordinator_001",
             "enabled": self.settings.coordinator_enabled,
@@ -164,9 +213,21 @@ class FileConfig:
     
     def __init__(self, settings: Settings):
         self.settings = settings
+        
+        # Settings don't change at runtime, so build the configs once
+        self._upload_config = self._build_upload_config()
+        self._processing_config = self._build_processing_config()
     
     def get_upload_config(self) -> Dict[str, Any]:
-        """Get upload configuration."""
+        """Get upload configuration (shared; do not mutate)."""
+        return self._upload_config
+    
+    def get_processing_config(self) -> Dict[str, Any]:
+        """Get image processing configuration (shared; do not mutate)."""
+        return self._processing_config
+    
+    def _build_upload_config(self) -> Dict[str, Any]:
+        """Build upload configuration."""
         return {
             "upload_directory": self.settings.upload_directory,
             "max_file_size_bytes": self.settings.max_file_size_mb * 1024 * 1024,
@@ -175,8 +236,8 @@ class FileConfig:
             "thumbnail_size": (150, 150)
         }
     
-    def get_processing_config(self) -> Dict[str, Any]:
-        """Get image processing configuration."""
+    def _build_processing_config(self) -> Dict[str, Any]:
+        """Build image processing configuration."""
         return {
             "processed_directory": self.settings.processed_directory,
             "collage_directory": self.settings.collage_directory,
@@ -194,23 +255,73 @@ def setup_logging(settings: Settings) -> None:
     """
     Setup logging configuration.
     
+    Log records are handed to a queue and written by a background listener
+    thread, so logging calls never block on console or file I/O.
+    
     Args:
         settings: Application settings
     """
-    logging.basicConfig(
-        level=getattr(logging, settings.log_level),
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('design_system.log')
-        ]
-    )
+    global _log_listener
+    if _log_listener is not None:
+        return
+    
+    # The format never uses thread or process fields, so skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    
+    log_queue = queue.SimpleQueue()
+    _log_listener = QueueListener(log_queue, *_build_log_handlers(), respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, settings.log_level))
+    root_logger.addHandler(QueueHandler(log_queue))
     
     # Set specific loggers
     logging.getLogger("uvicorn").setLevel(logging.INFO)
     logging.getLogger("fastapi").setLevel(logging.INFO)
 
 
+def setup_worker_logging() -> None:
+    """
+    Give a forked worker process its own log handlers.
+    
+    Process pool workers inherit the root logger's QueueHandler but not the
+    listener thread draining it, so their records would sit in the copied
+    queue forever. The inherited queue handlers are swapped for handlers
+    that write directly. Does nothing if setup_logging() was never called.
+    """
+    root_logger = logging.getLogger()
+    queue_handlers = [h for h in root_logger.handlers if isinstance(h, QueueHandler)]
+    if not queue_handlers:
+        return
+    
+    for handler in queue_handlers:
+        root_logger.removeHandler(handler)
+    for handler in _build_log_handlers():
+        root_logger.addHandler(handler)
+
+
+def _build_log_handlers() -> Tuple[logging.StreamHandler, logging.FileHandler]:
+    """
+    Build the console and file handlers that log records are written to.
+    
+    The file is appended to without rotation: several uvicorn workers and
+    their pool processes may write it at once, and rotating from more than
+    one process loses records. Rotate it externally (e.g. logrotate).
+    
+    Returns:
+        Handlers with the shared formatter applied
+    """
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = (logging.StreamHandler(), logging.FileHandler('design_system.log'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
 def create_directories(settings: Settings) -> None:
     """
     Create necessary directories.
@@ -230,6 +341,9 @@ def create_directories(settings: Settings) -> None:
         Path(directory).mkdir(parents=True, exist_ok=True)
 
 
+# Background listener started by setup_logging()
+_log_listener: Optional[QueueListener] = None
+
 # Global settings instance
 settings = Settings()
 
@@ -9,13 +9,212 @@ This script shows how to:
 4. Download results
 """
 
+import json
+import math
+import mimetypes
 import requests
 import time
 import os
+import shutil
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
 from pathlib import Path
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def upload_images_and_generate_collage(image_paths, api_base_url="http://localhost:8000"):
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
+
+# The IP literal skips name resolution (and a possible IPv6-first stall) on the demo path
+API_BASE_URL = "http://127.0.0.1:8000"
+
+# Task statuses after which no further events are sent
+FINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+# How often a dropped event stream is reopened before giving up
+MAX_EVENT_STREAM_RECONNECTS = 5
+
+# Bytes copied per write when saving a downloaded collage
+DOWNLOAD_CHUNK_SIZE = 128 * 1024
+
+# Upload requests sent at once, and the fewest files worth a request of their own
+MAX_PARALLEL_UPLOADS = 6
+MIN_FILES_PER_UPLOAD = 4
+
+
+def create_session():
+    """
+    Create an HTTP session that keeps connections to the API alive.
+    
+    Returns:
+        requests.Session with pooled connections and fast retries
+    """
+    session = requests.Session()
+    # Retry refused connections quickly for any method (nothing was sent), but
+    # gateway/busy responses for GET only: a rejected upload has already been
+    # saved server-side and a streamed body can't be replayed
+    adapter = HTTPAdapter(
+        pool_connections=8,
+        pool_maxsize=32,
+        max_retries=Retry(
+            total=2,
+            connect=2,
+            read=False,
+            backoff_factor=0.1,
+            status_forcelist=(502, 503, 504),
+            raise_on_status=False,
+            allowed_methods=frozenset({'GET'})
+        )
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Accept': 'application/json',
+        'User-Agent': 'mycraftcrew-example/1.0'
+    })
+    return session
+
+
+# Shared by every call so status checks and downloads reuse open connections
+SESSION = create_session()
+
+
+def post_images(upload_url, image_paths, form_data=None):
+    """
+    Upload image files in a single multipart request.
+    
+    With requests-toolbelt installed the body is streamed from the open
+    files; otherwise requests builds it in memory.
+    
+    Args:
+        upload_url: URL of the upload endpoint
+        image_paths: List of paths to image files
+        form_data: Optional extra form fields
+        
+    Returns:
+        The upload response
+    """
+    form_data = form_data or {}
+    with ExitStack() as stack:
+        fields = [
+            ('files', (
+                os.path.basename(image_path),
+                stack.enter_context(open(image_path, 'rb')),
+                mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+            ))
+            for image_path in image_paths
+        ]
+        
+        if MultipartEncoder is None:
+            return SESSION.post(upload_url, data=form_data, files=fields)
+        
+        encoder = MultipartEncoder(fields=list(form_data.items()) + fields)
+        return SESSION.post(
+            upload_url,
+            data=encoder,
+            headers={'Content-Type': encoder.content_type}
+        )
+
+
+def upload_images(image_paths, api_base_url=API_BASE_URL):
+    """
+    Upload images and start collage generation for them.
+    
+    Large sets are split across several parallel upload requests; the
+    combined images are then submitted to the generate endpoint as one task.
+    
+    Args:
+        image_paths: List of paths to image files
+        api_base_url: Base URL of the API server
+        
+    Returns:
+        Tuple of (task ID, None), or (None, failed response)
+    """
+    upload_url = f"{api_base_url}/api/v1/upload/images"
+    shard_size = max(MIN_FILES_PER_UPLOAD, math.ceil(len(image_paths) / MAX_PARALLEL_UPLOADS))
+    if len(image_paths) <= shard_size:
+        response = post_images(upload_url, image_paths)
+        if response.status_code != 200:
+            return None, response
+        return response.json()['task_id'], None
+    
+    shards = [image_paths[i:i + shard_size] for i in range(0, len(image_paths), shard_size)]
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_UPLOADS) as executor:
+        responses = list(executor.map(
+            lambda shard: post_images(upload_url, shard, {'create_task': 'false'}),
+            shards
+        ))
+    
+    uploaded_images = []
+    for response in responses:
+        if response.status_code != 200:
+            return None, response
+        uploaded_images.extend(response.json()['uploaded_images'])
+    
+    response = SESSION.post(f"{api_base_url}/api/v1/design/generate", json=uploaded_images)
+    if response.status_code != 200:
+        return None, response
+    return response.json()['task']['id'], None
+
+
+def wait_for_task(task_id, api_base_url=API_BASE_URL):
+    """
+    Wait for a task to finish by following its server-sent event stream.
+    
+    Args:
+        task_id: ID of the task to wait for
+        api_base_url: Base URL of the API server
+        
+    Returns:
+        Final task data, or None if the stream could not be followed
+    """
+    last_event_id = None
+    for attempt in range(MAX_EVENT_STREAM_RECONNECTS + 1):
+        headers = {'Accept': 'text/event-stream'}
+        if last_event_id:
+            headers['Last-Event-ID'] = last_event_id
+        
+        try:
+            with SESSION.get(
+                f"{api_base_url}/api/v1/task/{task_id}/events",
+                headers=headers,
+                stream=True,
+                timeout=(5, 60)
+            ) as response:
+                if response.status_code != 200:
+                    print(f"❌ Failed to follow task: {response.status_code}")
+                    return None
+                
+                event_id, data_lines = None, []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line.startswith('id:'):
+                        event_id = line[3:].strip()
+                    elif line.startswith('data:'):
+                        data_lines.append(line[5:].strip())
+                    elif not line and data_lines:
+                        # A blank line ends the event
+                        task_data = json.loads('\n'.join(data_lines))
+                        last_event_id, data_lines = event_id, []
+                        print(f"📊 Status: {task_data['status']}")
+                        if task_data['status'] in FINAL_STATUSES:
+                            return task_data
+        except (requests.exceptions.ChunkedEncodingError, requests.exceptions.Timeout):
+            pass
+        
+        if attempt < MAX_EVENT_STREAM_RECONNECTS:
+            print("🔌 Event stream dropped, reconnecting...")
+            time.sleep(1)
+    
+    print("❌ Gave up waiting for the task")
+    return None
+
+
+def upload_images_and_generate_collage(image_paths, api_base_url=API_BASE_URL):
     """
     Upload images and generate a collage.
     
@@ -35,76 +234,53 @@ def upload_images_and_generate_collage(image_paths, api_base_url="http://localho
     
     print(f"📸 Uploading {len(image_paths)} images...")
     
-    # Prepare files for upload
-    files = []
-    for image_path in image_paths:
-        files.append(('files', open(image_path, 'rb')))
-    
     try:
         # Upload images
-        response = requests.post(
-            f"{api_base_url}/api/v1/upload/images",
-            files=files
-        )
+        task_id, failed_response = upload_images(image_paths, api_base_url)
         
-        # Close file handles
-        for _, file_handle in files:
-            file_handle.close()
-        
-        if response.status_code == 200:
-            result = response.json()
-            task_id = result['task_id']
+        if task_id is not None:
             print(f"✅ Images uploaded successfully!")
             print(f"📋 Task ID: {task_id}")
             
             # Wait for processing
             print("⏳ Waiting for collage generation...")
-            while True:
-                status_response = requests.get(f"{api_base_url}/api/v1/task/{task_id}")
+            task_data = wait_for_task(task_id, api_base_url)
+            if task_data is None:
+                return None
+            
+            status = task_data['status']
+            if status == 'completed':
+                print("🎉 Collage generation completed!")
                 
-                if status_response.status_code == 200:
-                    task_data = status_response.json()['task']
-                    status = task_data['status']
-                    
-                    print(f"📊 Status: {status}")
-                    
-                    if status == 'completed':
-                        print("🎉 Collage generation completed!")
-                        
-                        # Download the result
-                        result_response = requests.get(f"{api_base_url}/api/v1/task/{task_id}/result")
-                        
-                        if result_response.status_code == 200:
-                            # Save the collage
-                            output_filename = f"collage_{task_id}.jpg"
-                            with open(output_filename, 'wb') as f:
-                                f.write(result_response.content)
-                            
-                            print(f"💾 Collage saved as: {output_filename}")
-                            return output_filename
-                        else:
-                            print(f"❌ Failed to download result: {result_response.status_code}")
-                            return None
-                    
-                    elif status == 'failed':
-                        print(f"❌ Task failed: {task_data.get('error_message', 'Unknown error')}")
+                # Download the result, streaming it straight to disk
+                with SESSION.get(
+                    f"{api_base_url}/api/v1/task/{task_id}/result",
+                    stream=True
+                ) as result_response:
+                    if result_response.status_code != 200:
+                        print(f"❌ Failed to download result: {result_response.status_code}")
                         return None
                     
-                    elif status in ['pending', 'in_progress']:
-                        time.sleep(2)  # Wait 2 seconds before checking again
-                        continue
-                    
-                    else:
-                        print(f"❓ Unknown status: {status}")
-                        return None
+                    # Save the collage
+                    output_filename = f"collage_{task_id}.jpg"
+                    result_response.raw.decode_content = True
+                    with open(output_filename, 'wb') as f:
+                        shutil.copyfileobj(result_response.raw, f, DOWNLOAD_CHUNK_SIZE)
                 
-                else:
-                    print(f"❌ Failed to check status: {status_response.status_code}")
-                    return None
+                print(f"💾 Collage saved as: {output_filename}")
+                return output_filename
+            
+            elif status == 'failed':
+                print(f"❌ Task failed: {task_data.get('error_message', 'Unknown error')}")
+                return None
+            
+            else:
+                print(f"❓ Task ended with status: {status}")
+                return None
         
         else:
-            print(f"❌ Upload failed: {response.status_code}")
-            print(f"Error: {response.text}")
+            print(f"❌ Upload failed: {failed_response.status_code}")
+            print(f"Error: {failed_response.text}")
             return None
     
     except requests.exceptions.ConnectionError:
@@ -115,10 +291,10 @@ def upload_images_and_generate_collage(image_paths, api_base_url="http://localho
         return None
 
 
-def check_server_health(api_base_url="http://localhost:8000"):
+def check_server_health(api_base_url=API_BASE_URL):
     """Check if the server is running and healthy."""
     try:
-        response = requests.get(f"{api_base_url}/api/v1/health")
+        response = SESSION.get(f"{api_base_url}/api/v1/health")
         if response.status_code == 200:
             health_data = response.json()
             print(f"✅ Server is healthy!")
@@ -132,6 +308,32 @@ def check_server_health(api_base_url="http://localhost:8000"):
         return False
 
 
+def write_solid_png(path, color, size):
+    """
+    Write a single-colour RGB PNG without needing an imaging library.
+    
+    Args:
+        path: Output file path
+        color: (R, G, B) fill colour
+        size: (width, height) in pixels
+    """
+    width, height = size
+    
+    def chunk(kind, data):
+        return (
+            struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(kind + data))
+        )
+    
+    # Every scanline is a filter byte (0 = none) followed by its pixels
+    scanlines = (b'\x00' + bytes(color) * width) * height
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(scanlines)))
+        f.write(chunk(b'IEND', b''))
+
+
 def main():
     """Main function to run the example."""
     
@@ -154,23 +356,15 @@ def main():
     # Check if example images exist, if not, create some dummy ones
     if not all(os.path.exists(img) for img in example_images):
         print("📝 Creating example images...")
-        try:
-            from PIL import Image
-            
-            # Create some simple colored squares as example images
-            colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]  # Red, Green, Blue
-            
-            for i, color in enumerate(colors):
-                img = Image.new('RGB', (200, 200), color)
-                img.save(f"example{i+1}.jpg")
-                print(f"   Created example{i+1}.jpg")
-            
-            example_images = [f"example{i+1}.jpg" for i in range(len(colors))]
-            
-        except ImportError:
-            print("❌ PIL not available. Please provide your own images.")
-            print("   Place some .jpg files in the current directory and modify the script.")
-            return
+        
+        # Create some simple colored squares as example images
+        colors = [(255, 0, 0), (0, 255, 0), (0, 0, 255)]  # Red, Green, Blue
+        
+        for i, color in enumerate(colors):
+            write_solid_png(f"example{i+1}.png", color, (200, 200))
+            print(f"   Created example{i+1}.png")
+        
+        example_images = [f"example{i+1}.png" for i in range(len(colors))]
     
     # Generate collage
     result_file = upload_images_and_generate_collage(example_images)
@@ -178,7 +372,7 @@ def main():
     if result_file:
         print(f"\n🎊 Success! Your collage is ready: {result_file}")
         print("\n📚 API Documentation available at:")
-        print("   http://localhost:8000/docs")
+        print(f"   {API_BASE_URL}/docs")
     else:
         print("\n😞 Collage generation failed. Check the logs above.")
 
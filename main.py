@@ -14,9 +14,12 @@ from fastapi.staticfiles import StaticFiles
 import uvicorn
 
 from config.settings import settings, setup_logging, create_directories
-from api.routes import router, set_design_agent
+from api.routes import router, start_design_workers, task_store, periodic_cleanup
 from api.middleware import setup_middleware
 from agents.design_agent import DesignAgent
+from utils.executors import shutdown_process_pool
+
+logger = logging.getLogger("main")
 
 
 @asynccontextmanager
@@ -27,33 +30,51 @@ async def lifespan(app: FastAPI):
     Handles startup and shutdown events.
     """
     # Startup
-    logging.info("Starting MyCraftCrew...")
+    logger.info("Starting MyCraftCrew...")
     
     # Create necessary directories
     create_directories(settings)
     
     # Initialize and start agents
-    design_agent = DesignAgent()
-    await design_agent.start()
+    design_agents = [
+        DesignAgent(f"design_agent_{i:03d}")
+        for i in range(1, settings.design_agent_count + 1)
+    ]
+    for design_agent in design_agents:
+        await design_agent.start()
     
-    # Set global design agent reference for routes
-    set_design_agent(design_agent)
+    # Feed the agents from a shared queue
+    design_workers = start_design_workers(design_agents, settings.design_queue_size)
     
     # Store agents in app state
-    app.state.design_agent = design_agent
+    app.state.design_agents = design_agents
+    
+    # Start periodic task/file cleanup
+    cleanup_task = asyncio.create_task(periodic_cleanup(settings.cleanup_interval_seconds))
     
-    logging.info("MyCraftCrew started successfully")
+    logger.info("MyCraftCrew started successfully")
     
     yield
     
     # Shutdown
-    logging.info("Shutting down MyCraftCrew...")
+    logger.info("Shutting down MyCraftCrew...")
+    
+    cleanup_task.cancel()
     
     # Stop agents
-    if hasattr(app.state, 'design_agent'):
-        await app.state.design_agent.stop()
+    for worker in design_workers:
+        worker.cancel()
+    await asyncio.gather(*design_workers, return_exceptions=True)
+    for design_agent in design_agents:
+        await design_agent.stop()
     
-    logging.info("MyCraftCrew stopped")
+    # Release collage worker processes
+    shutdown_process_pool()
+    
+    # Close task storage connections
+    await task_store.close()
+    
+    logger.info("MyCraftCrew stopped")
 
 
 def create_app() -> FastAPI:
@@ -66,13 +87,15 @@ def create_app() -> FastAPI:
     # Setup logging
     setup_logging(settings)
     
+    name, version, debug = settings.app_name, settings.app_version, settings.debug
+    
     # Create FastAPI app
     app = FastAPI(
-        title=settings.app_name,
-        version=settings.app_version,
+        title=name,
+        version=version,
         description="MyCraftCrew - A multi-agent system for generating product designs and collages",
         lifespan=lifespan,
-        debug=settings.debug
+        debug=debug
     )
     
     # Setup middleware
@@ -82,38 +105,77 @@ def create_app() -> FastAPI:
     app.include_router(router)
     
     # Mount static files (if needed)
-    if settings.debug:
+    if settings.serve_static:
         app.mount("/static", StaticFiles(directory="static"), name="static")
     
-    # Root endpoint
+    # Root endpoint (the payload never changes, so build it once)
+    root_info = {
+        "message": "Welcome to MyCraftCrew",
+        "version": version,
+        "docs": "/docs",
+        "health": "/api/v1/health"
+    }
+    
     @app.get("/")
     async def root():
-        return {
-            "message": "Welcome to MyCraftCrew",
-            "version": settings.app_version,
-            "docs": "/docs",
-            "health": "/api/v1/health"
-        }
+        return root_info
     
     return app
 
 
-def main():
+def run_dev():
     """
-    Main entry point for running the application.
+    Run a single auto-reloading server for local development.
     """
-    # Create app
-    app = create_app()
-    
-    # Run server
+    host, port, log_level = settings.host, settings.port, settings.log_level.lower()
+    uvicorn.run(
+        "main:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        reload=True,
+        log_level=log_level,
+        loop=settings.event_loop,
+        http=settings.http_protocol
+    )
+
+
+def run_prod():
+    """
+    Run the production server without file watching.
+    """
+    host, port, log_level = settings.host, settings.port, settings.log_level.lower()
+    workers = settings.workers
+    if workers > 1 and not settings.redis_url:
+        # In-process task storage can't be shared between worker processes
+        logger.warning("Running a single worker; WORKERS > 1 needs REDIS_URL")
+        workers = 1
+    
+    # Each worker process builds its own app from the factory
     uvicorn.run(
-        app,
-        host=settings.host,
-        port=settings.port,
-        reload=settings.reload,
-        log_level=settings.log_level.lower()
+        "main:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        log_level=log_level,
+        loop=settings.event_loop,
+        http=settings.http_protocol,
+        backlog=settings.backlog,
+        limit_concurrency=settings.limit_concurrency,
+        timeout_keep_alive=settings.timeout_keep_alive
     )
 
 
+def main():
+    """
+    Main entry point for running the application.
+    """
+    if settings.reload:
+        run_dev()
+    else:
+        run_prod()
+
+
 if __name__ == "__main__":
     main()
@@ -7,16 +7,19 @@ image processing, and collage creation.
 
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Literal, Optional, Tuple, Any
 from uuid import UUID
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, TypeAdapter
 
-from .task_models import ImageInfo, CollageLayout
+from .task_models import ImageInfo, CollageLayout, REQUEST_MODEL_CONFIG
+from utils.clock import utc_now
 
 
 class ImagePosition(BaseModel):
     """Position and size of an image in a collage."""
+    model_config = REQUEST_MODEL_CONFIG
+    
     x: int = Field(ge=0)
     y: int = Field(ge=0)
     width: int = Field(gt=0)
@@ -27,6 +30,8 @@ class ImagePosition(BaseModel):
 
 class CollageElement(BaseModel):
     """An element in a collage (image with position)."""
+    model_config = REQUEST_MODEL_CONFIG
+    
     image_id: UUID
     position: ImagePosition
     layer: int = Field(default=0, ge=0)  # For layering/z-index
@@ -46,15 +51,23 @@ class CollageTemplate(BaseModel):
 
 class ProcessingOptions(BaseModel):
     """Options for image processing."""
-    resize_mode: str = Field(default="fit", pattern=r"^(fit|fill|crop|stretch)$")
+    model_config = REQUEST_MODEL_CONFIG
+    
+    resize_mode: Literal["fit", "fill", "crop", "stretch"] = "fit"
     quality: int = Field(default=95, ge=1, le=100)
     optimize: bool = Field(default=True)
+    # Extra Huffman-table pass on JPEG output; smaller files, noticeably slower encodes
+    optimize_encoding: bool = Field(default=False)
     preserve_aspect_ratio: bool = Field(default=True)
+    # Batch pipelines that never read ImageProcessingResult.quality_score can skip it
+    compute_quality_score: bool = Field(default=True)
     max_file_size_mb: int = Field(default=10, ge=1, le=100)
 
 
 class DesignRequest(BaseModel):
     """Request for design generation."""
+    model_config = REQUEST_MODEL_CONFIG
+    
     images: List[ImageInfo]
     layout: CollageLayout = CollageLayout.GRID
     template: Optional[str] = None
@@ -91,7 +104,7 @@ class ImageProcessingResult(BaseModel):
 class CollageGenerationResult(BaseModel):
     """Result of collage generation."""
     task_id: UUID
-    generated_at: datetime = Field(default_factory=datetime.utcnow)
+    generated_at: datetime = Field(default_factory=utc_now)
     output_file_path: str
     output_format: str
     output_width: int
@@ -105,9 +118,11 @@ class CollageGenerationResult(BaseModel):
 
 class BatchProcessingRequest(BaseModel):
     """Request for batch processing multiple designs."""
+    model_config = REQUEST_MODEL_CONFIG
+    
     requests: List[DesignRequest]
     batch_id: UUID
-    priority: str = Field(default="normal", pattern=r"^(low|normal|high|urgent)$")
+    priority: Literal["low", "normal", "high", "urgent"] = "normal"
     notify_on_completion: bool = Field(default=True)
 
 
@@ -119,4 +134,9 @@ class BatchProcessingResult(BaseModel):
     failed_requests: int
     results: List[CollageGenerationResult]
     total_processing_time_seconds: float
-    completed_at: datetime = Field(default_factory=datetime.utcnow)
+    completed_at: datetime = Field(default_factory=utc_now)
+
+
+# Validators for list-shaped request bodies, built once instead of per request
+IMAGES_ADAPTER = TypeAdapter(List[ImageInfo])
+BATCH_ADAPTER = TypeAdapter(List[DesignRequest])
@@ -10,7 +10,14 @@ from enum import Enum
 from typing import Dict, List, Optional, Any, Union
 from uuid import UUID, uuid4
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from utils.clock import utc_now
+from utils.colors import HEX_COLOR_PATTERN
+
+
+# Configuration for models that arrive in requests and are never modified afterwards
+REQUEST_MODEL_CONFIG = ConfigDict(frozen=True, extra="forbid", str_strip_whitespace=True)
 
 
 class TaskStatus(str, Enum):
@@ -57,22 +64,27 @@ class CollageLayout(str, Enum):
 
 class ImageInfo(BaseModel):
     """Information about an uploaded image."""
+    model_config = REQUEST_MODEL_CONFIG
+    
     id: UUID = Field(default_factory=uuid4)
     filename: str
     format: ImageFormat
     width: int
     height: int
     size_bytes: int
-    upload_timestamp: datetime = Field(default_factory=datetime.utcnow)
+    upload_timestamp: datetime = Field(default_factory=utc_now)
     file_path: str
+    sha256: Optional[str] = None
     
-    @validator('width', 'height')
+    @field_validator('width', 'height')
+    @classmethod
     def validate_dimensions(cls, v):
         if v <= 0:
             raise ValueError('Dimensions must be positive')
         return v
     
-    @validator('size_bytes')
+    @field_validator('size_bytes')
+    @classmethod
     def validate_size(cls, v):
         if v <= 0:
             raise ValueError('File size must be positive')
@@ -81,10 +93,12 @@ class ImageInfo(BaseModel):
 
 class DesignSpecification(BaseModel):
     """Specification for design generation."""
+    model_config = REQUEST_MODEL_CONFIG
+    
     layout: CollageLayout = CollageLayout.GRID
     output_width: int = Field(default=1024, ge=100, le=4096)
     output_height: int = Field(default=1024, ge=100, le=4096)
-    background_color: str = Field(default="#FFFFFF", pattern=r"^#[0-9A-Fa-f]{6}$")
+    background_color: str = Field(default="#FFFFFF", pattern=HEX_COLOR_PATTERN)
     spacing: int = Field(default=10, ge=0, le=100)
     border_radius: int = Field(default=0, ge=0, le=50)
     
@@ -95,8 +109,8 @@ class DesignSpecification(BaseModel):
 class Task(BaseModel):
     """A task to be processed by agents."""
     id: UUID = Field(default_factory=uuid4)
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utc_now)
+    updated_at: datetime = Field(default_factory=utc_now)
     status: TaskStatus = TaskStatus.PENDING
     priority: TaskPriority = TaskPriority.NORMAL
     
@@ -117,7 +131,7 @@ class Task(BaseModel):
     def update_status(self, status: TaskStatus, error_message: Optional[str] = None):
         """Update task status and timestamp."""
         self.status = status
-        self.updated_at = datetime.utcnow()
+        self.updated_at = utc_now()
         if error_message:
             self.error_message = error_message
 
@@ -125,7 +139,7 @@ class Task(BaseModel):
 class AgentMessage(BaseModel):
     """Message for inter-agent communication."""
     id: UUID = Field(default_factory=uuid4)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=utc_now)
     sender: str
     recipient: str
     message_type: str
@@ -147,7 +161,7 @@ class AgentStatus(BaseModel):
 class DesignResult(BaseModel):
     """Result of a design generation task."""
     task_id: UUID
-    generated_at: datetime = Field(default_factory=datetime.utcnow)
+    generated_at: datetime = Field(default_factory=utc_now)
     output_file_path: str
     output_format: ImageFormat
     output_width: int
@@ -174,6 +188,14 @@ class TaskResponse(BaseModel):
     result: Optional[DesignResult] = None
 
 
+class TaskListResponse(BaseModel):
+    """Response for task listings."""
+    tasks: List[Task]
+    total: int
+    limit: int
+    offset: int
+
+
 class AgentRegistration(BaseModel):
     """Registration information for new agents."""
     agent_id: str
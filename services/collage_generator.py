@@ -5,13 +5,15 @@ This module provides collage creation capabilities including
 different layout algorithms and image arrangement strategies.
 """
 
+import asyncio
 import os
 import math
 import logging
-from datetime import datetime
+import time
 from typing import List, Tuple, Optional, Dict, Any
 from uuid import UUID
 
+import PIL
 from PIL import Image, ImageDraw, ImageFont
 
 from models.task_models import ImageInfo, ImageFormat
@@ -19,6 +21,14 @@ from models.design_models import (
     CollageLayout, CollageElement, ImagePosition, 
     DesignRequest, CollageGenerationResult, ProcessingOptions
 )
+from utils.clock import utc_now
+from utils.colors import parse_color
+from utils.executors import get_thread_pool
+from utils.layout import grid_dimensions
+
+
+# Write buffer for saved collages (4 MiB holds a typical 4K JPEG)
+SAVE_BUFFER_SIZE = 4 * 1024 * 1024
 
 
 class CollageGenerator:
@@ -38,6 +48,10 @@ class CollageGenerator:
         self.output_directory = output_directory
         self.logger = logging.getLogger("collage_generator")
         
+        # Pillow-SIMD reports versions like "9.5.0.post1"; log it so a
+        # deployment can confirm which resize kernels it is running
+        self.logger.info("Using Pillow %s", PIL.__version__)
+        
         # Create output directory if it doesn't exist
         os.makedirs(output_directory, exist_ok=True)
     
@@ -59,7 +73,7 @@ class CollageGenerator:
         Raises:
             Exception: If collage generation fails
         """
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         
         try:
             # Process images first
@@ -98,7 +112,7 @@ class CollageGenerator:
                 collage_image, task_id, request.output_width, request.output_height
             )
             
-            processing_time = (datetime.utcnow() - start_time).total_seconds()
+            processing_time = time.perf_counter() - start_time
             
             return CollageGenerationResult(
                 task_id=task_id,
@@ -107,7 +121,7 @@ class CollageGenerator:
                 output_width=request.output_width,
                 output_height=request.output_height,
                 processing_time_seconds=processing_time,
-                images_used=[img.id for img in processed_images],
+                images_used=[info.id for info, _ in processed_images],
                 layout_used=request.layout,
                 elements=elements,
                 metadata={
@@ -118,25 +132,49 @@ class CollageGenerator:
             )
             
         except Exception as e:
-            self.logger.error(f"Failed to generate collage for task {task_id}: {str(e)}")
+            self.logger.error("Failed to generate collage for task %s: %s", task_id, e)
             raise
     
+    def generate_collage_sync(
+        self,
+        request: DesignRequest,
+        task_id: UUID
+    ) -> CollageGenerationResult:
+        """
+        Synchronous entry point for generate_collage.
+        
+        Runs the generation on a private event loop so it can be submitted
+        to a process pool; the request only carries file paths, so it
+        pickles cheaply.
+        
+        Args:
+            request: Design request containing images and specifications
+            task_id: ID of the task this collage belongs to
+            
+        Returns:
+            CollageGenerationResult containing the generated collage
+        """
+        return asyncio.run(self.generate_collage(request, task_id))
+    
     async def _process_images_for_collage(
         self,
         images: List[ImageInfo],
         options: ProcessingOptions,
         target_size: Tuple[int, int]
-    ) -> List[ImageInfo]:
+    ) -> List[Tuple[ImageInfo, Image.Image]]:
         """
         Process images for collage generation.
         
+        The processed pixels are kept in memory so the layouts don't decode
+        the saved copies again.
+        
         Args:
             images: List of images to process
             options: Processing options
             target_size: Target collage size
             
         Returns:
-            List of processed ImageInfo objects
+            List of (processed ImageInfo, processed image) pairs
         """
         from .image_processor import ImageProcessor
         
@@ -160,8 +198,7 @@ class CollageGenerator:
             cols = 3
             rows = 3
         else:
-            cols = int(math.ceil(math.sqrt(num_images)))
-            rows = int(math.ceil(num_images / cols))
+            cols, rows = grid_dimensions(num_images)
         
         available_width = canvas_width - (spacing * (cols - 1))
         available_height = canvas_height - (spacing * (rows - 1))
@@ -169,31 +206,110 @@ class CollageGenerator:
         image_width = available_width // cols
         image_height = available_height // rows
         
-        # Process each image
-        for image_info in images:
-            try:
-                result = await processor.process_image(
+        # Process all images concurrently on the thread pool
+        loop = asyncio.get_running_loop()
+        pool = get_thread_pool()
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool,
+                    processor.process_image_in_memory_sync,
                     image_info,
                     options,
                     (image_width, image_height)
                 )
-                processed_images.append(result.processed_image)
-            except Exception as e:
-                self.logger.warning(f"Failed to process image {image_info.id}: {str(e)}")
+                for image_info in images
+            ),
+            return_exceptions=True
+        )
+        
+        for image_info, result in zip(images, results):
+            if isinstance(result, Exception):
+                self.logger.warning("Failed to process image %s: %s", image_info.id, result)
                 continue
+            processing_result, image = result
+            processed_images.append((processing_result.processed_image, image))
         
         return processed_images
     
+    def _new_canvas(self, request: DesignRequest) -> Image.Image:
+        """
+        Create the blank canvas for a collage.
+        
+        Args:
+            request: Design request
+            
+        Returns:
+            RGB canvas filled with the background colour
+        """
+        return Image.new(
+            "RGB",
+            (request.output_width, request.output_height),
+            parse_color(request.background_color)
+        )
+    
+    def _fit(self, img: Image.Image, max_size: Tuple[int, int]) -> Image.Image:
+        """
+        Scale an image down to fit within a bounding box.
+        
+        Matches Image.thumbnail (aspect ratio kept, never enlarged) but
+        returns a new image, leaving the processed original untouched.
+        The result is always RGB, so pasting it onto the canvas is a
+        straight row copy with no per-paste mode conversion.
+        
+        Args:
+            img: Image to scale
+            max_size: (width, height) to fit within
+            
+        Returns:
+            The resized RGB image
+        """
+        max_width, max_height = max_size
+        scale = min(max_width / img.width, max_height / img.height, 1.0)
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        resized = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        if resized.mode == "RGB":
+            return resized
+        
+        self.logger.debug("Converting %s tile to RGB", resized.mode)
+        return resized.convert("RGB")
+    
+    async def _fit_all(
+        self,
+        images: List[Tuple[ImageInfo, Image.Image]],
+        max_size: Tuple[int, int]
+    ) -> List[Tuple[ImageInfo, Any]]:
+        """
+        Scale several images to the same bounding box concurrently.
+        
+        Pillow releases the GIL while resampling, so tiles are prepared on
+        the thread pool and the caller pastes them in order.
+        
+        Args:
+            images: (info, image) pairs to scale
+            max_size: (width, height) to fit within
+            
+        Returns:
+            (info, resized image or the exception raised) for each input
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_thread_pool()
+        tiles = await asyncio.gather(
+            *(loop.run_in_executor(pool, self._fit, image, max_size) for _, image in images),
+            return_exceptions=True
+        )
+        return [(info, tile) for (info, _), tile in zip(images, tiles)]
+    
     async def _create_grid_collage(
         self,
-        images: List[ImageInfo],
+        images: List[Tuple[ImageInfo, Image.Image]],
         request: DesignRequest
     ) -> Tuple[Image.Image, List[CollageElement]]:
         """
         Create a grid-based collage.
         
         Args:
-            images: List of processed images
+            images: (info, image) pairs for the processed images
             request: Design request
             
         Returns:
@@ -203,15 +319,13 @@ class CollageGenerator:
         spacing = request.spacing
         
         # Create canvas
-        canvas = Image.new("RGB", (width, height), request.background_color)
+        canvas = self._new_canvas(request)
         
         if not images:
             return canvas, []
         
         # Calculate grid dimensions
-        num_images = len(images)
-        cols = int(math.ceil(math.sqrt(num_images)))
-        rows = int(math.ceil(num_images / cols))
+        cols, rows = grid_dimensions(len(images))
         
         # Calculate cell size
         available_width = width - (spacing * (cols - 1))
@@ -220,55 +334,53 @@ class CollageGenerator:
         cell_width = available_width // cols
         cell_height = available_height // rows
         
+        # Cell origins per column and row
+        column_xs = [col * (cell_width + spacing) for col in range(cols)]
+        row_ys = [row * (cell_height + spacing) for row in range(rows)]
+        
         elements = []
         
+        # Resize all tiles up front
+        tiles = await self._fit_all(images, (cell_width, cell_height))
+        
         # Place images in grid
-        for i, image_info in enumerate(images):
-            row = i // cols
-            col = i % cols
+        for i, (image_info, img) in enumerate(tiles):
+            if isinstance(img, Exception):
+                self.logger.error("Failed to resize image %s: %s", image_info.file_path, img)
+                continue
             
-            x = col * (cell_width + spacing)
-            y = row * (cell_height + spacing)
+            row, col = divmod(i, cols)
             
-            # Load and resize image - use the processed image path
-            try:
-                with Image.open(image_info.file_path) as img:
-                    # Resize to fit cell
-                    img.thumbnail((cell_width, cell_height), Image.Resampling.LANCZOS)
-                    
-                    # Center image in cell
-                    paste_x = x + (cell_width - img.width) // 2
-                    paste_y = y + (cell_height - img.height) // 2
-                    
-                    canvas.paste(img, (paste_x, paste_y))
-                    
-                    # Create element record
-                    element = CollageElement(
-                        image_id=image_info.id,
-                        position=ImagePosition(
-                            x=paste_x,
-                            y=paste_y,
-                            width=img.width,
-                            height=img.height
-                        )
-                    )
-                    elements.append(element)
-            except Exception as e:
-                self.logger.error(f"Failed to load image {image_info.file_path}: {str(e)}")
-                continue
+            # Center image in cell
+            paste_x = column_xs[col] + (cell_width - img.width) // 2
+            paste_y = row_ys[row] + (cell_height - img.height) // 2
+            
+            canvas.paste(img, (paste_x, paste_y))
+            
+            # Create element record
+            element = CollageElement(
+                image_id=image_info.id,
+                position=ImagePosition(
+                    x=paste_x,
+                    y=paste_y,
+                    width=img.width,
+                    height=img.height
+                )
+            )
+            elements.append(element)
         
         return canvas, elements
     
     async def _create_stacked_collage(
         self,
-        images: List[ImageInfo],
+        images: List[Tuple[ImageInfo, Image.Image]],
         request: DesignRequest
     ) -> Tuple[Image.Image, List[CollageElement]]:
         """
         Create a stacked collage (images arranged vertically).
         
         Args:
-            images: List of processed images
+            images: (info, image) pairs for the processed images
             request: Design request
             
         Returns:
@@ -278,7 +390,7 @@ class CollageGenerator:
         spacing = request.spacing
         
         # Create canvas
-        canvas = Image.new("RGB", (width, height), request.background_color)
+        canvas = self._new_canvas(request)
         
         if not images:
             return canvas, []
@@ -290,48 +402,46 @@ class CollageGenerator:
         elements = []
         current_y = 0
         
+        # Resize all images up front
+        tiles = await self._fit_all(images, (width, image_height))
+        
         # Stack images vertically
-        for image_info in images:
-            # Load and resize image - use the processed image path
-            try:
-                with Image.open(image_info.file_path) as img:
-                    # Resize to fit width and calculated height
-                    img.thumbnail((width, image_height), Image.Resampling.LANCZOS)
-                    
-                    # Center horizontally
-                    paste_x = (width - img.width) // 2
-                    
-                    canvas.paste(img, (paste_x, current_y))
-                    
-                    # Create element record
-                    element = CollageElement(
-                        image_id=image_info.id,
-                        position=ImagePosition(
-                            x=paste_x,
-                            y=current_y,
-                            width=img.width,
-                            height=img.height
-                        )
-                    )
-                    elements.append(element)
-                    
-                    current_y += img.height + spacing
-            except Exception as e:
-                self.logger.error(f"Failed to load image {image_info.file_path}: {str(e)}")
+        for image_info, img in tiles:
+            if isinstance(img, Exception):
+                self.logger.error("Failed to resize image %s: %s", image_info.file_path, img)
                 continue
+            
+            # Center horizontally
+            paste_x = (width - img.width) // 2
+            
+            canvas.paste(img, (paste_x, current_y))
+            
+            # Create element record
+            element = CollageElement(
+                image_id=image_info.id,
+                position=ImagePosition(
+                    x=paste_x,
+                    y=current_y,
+                    width=img.width,
+                    height=img.height
+                )
+            )
+            elements.append(element)
+            
+            current_y += img.height + spacing
         
         return canvas, elements
     
     async def _create_circular_collage(
         self,
-        images: List[ImageInfo],
+        images: List[Tuple[ImageInfo, Image.Image]],
         request: DesignRequest
     ) -> Tuple[Image.Image, List[CollageElement]]:
         """
         Create a circular collage (images arranged in a circle).
         
         Args:
-            images: List of processed images
+            images: (info, image) pairs for the processed images
             request: Design request
             
         Returns:
@@ -340,7 +450,7 @@ class CollageGenerator:
         width, height = request.output_width, request.output_height
         
         # Create canvas
-        canvas = Image.new("RGB", (width, height), request.background_color)
+        canvas = self._new_canvas(request)
         
         if not images:
             return canvas, []
@@ -354,48 +464,52 @@ class CollageGenerator:
         
         elements = []
         
+        # Resize all images up front
+        tiles = await self._fit_all(images, (image_size, image_size))
+        
+        # Top-left corner of each slot around the circle
+        num_images = len(images)
+        half_size = image_size // 2
+        slots = []
+        for i in range(num_images):
+            angle = (2 * math.pi * i) / num_images
+            slots.append((
+                int(center_x + radius * math.cos(angle) - half_size),
+                int(center_y + radius * math.sin(angle) - half_size)
+            ))
+        
         # Place images in circle
-        for i, image_info in enumerate(images):
-            angle = (2 * math.pi * i) / len(images)
+        for (x, y), (image_info, img) in zip(slots, tiles):
+            if isinstance(img, Exception):
+                self.logger.error("Failed to resize image %s: %s", image_info.file_path, img)
+                continue
             
-            # Calculate position
-            x = center_x + radius * math.cos(angle) - image_size // 2
-            y = center_y + radius * math.sin(angle) - image_size // 2
+            canvas.paste(img, (x, y))
             
-            # Load and resize image - use the processed image path
-            try:
-                with Image.open(image_info.file_path) as img:
-                    img.thumbnail((image_size, image_size), Image.Resampling.LANCZOS)
-                    
-                    canvas.paste(img, (int(x), int(y)))
-                    
-                    # Create element record
-                    element = CollageElement(
-                        image_id=image_info.id,
-                        position=ImagePosition(
-                            x=int(x),
-                            y=int(y),
-                            width=img.width,
-                            height=img.height
-                        )
-                    )
-                    elements.append(element)
-            except Exception as e:
-                self.logger.error(f"Failed to load image {image_info.file_path}: {str(e)}")
-                continue
+            # Create element record
+            element = CollageElement(
+                image_id=image_info.id,
+                position=ImagePosition(
+                    x=x,
+                    y=y,
+                    width=img.width,
+                    height=img.height
+                )
+            )
+            elements.append(element)
         
         return canvas, elements
     
     async def _create_freeform_collage(
         self,
-        images: List[ImageInfo],
+        images: List[Tuple[ImageInfo, Image.Image]],
         request: DesignRequest
     ) -> Tuple[Image.Image, List[CollageElement]]:
         """
         Create a freeform collage (random placement).
         
         Args:
-            images: List of processed images
+            images: (info, image) pairs for the processed images
             request: Design request
             
         Returns:
@@ -406,71 +520,71 @@ class CollageGenerator:
         width, height = request.output_width, request.output_height
         
         # Create canvas
-        canvas = Image.new("RGB", (width, height), request.background_color)
+        canvas = self._new_canvas(request)
         
         if not images:
             return canvas, []
         
         elements = []
-        used_positions = []
+        
+        # Placed top-left corners bucketed by cell; cells are as large as
+        # the largest tile, so an overlap test touches at most 3x3 cells
+        cell_size = 300
+        used_cells: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
         
         # Place images randomly
-        for image_info in images:
-            # Load image - use the processed image path
+        for image_info, image in images:
             try:
-                with Image.open(image_info.file_path) as img:
-                    # Random size between 100-300px
-                    max_size = random.randint(100, 300)
-                    img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-                    
-                    # Find random position that doesn't overlap too much
-                    attempts = 0
-                    while attempts < 50:  # Prevent infinite loop
-                        x = random.randint(0, width - img.width)
-                        y = random.randint(0, height - img.height)
-                        
-                        # Check for overlap
-                        overlaps = False
-                        for pos in used_positions:
-                            if (abs(x - pos[0]) < img.width and 
-                                abs(y - pos[1]) < img.height):
-                                overlaps = True
-                                break
-                        
-                        if not overlaps:
-                            break
-                        attempts += 1
+                # Random size between 100-300px
+                max_size = random.randint(100, 300)
+                img = self._fit(image, (max_size, max_size))
+                
+                # Find random position that doesn't overlap too much
+                img_width, img_height = img.size
+                max_x, max_y = width - img_width, height - img_height
+                for _ in range(50):  # Prevent infinite loop
+                    x = random.randint(0, max_x)
+                    y = random.randint(0, max_y)
                     
-                    canvas.paste(img, (x, y))
-                    used_positions.append((x, y))
-                    
-                    # Create element record
-                    element = CollageElement(
-                        image_id=image_info.id,
-                        position=ImagePosition(
-                            x=x,
-                            y=y,
-                            width=img.width,
-                            height=img.height
-                        )
+                    # Check for overlap
+                    if not any(
+                        abs(x - used_x) < img_width and abs(y - used_y) < img_height
+                        for cell_x in range((x - img_width) // cell_size, (x + img_width) // cell_size + 1)
+                        for cell_y in range((y - img_height) // cell_size, (y + img_height) // cell_size + 1)
+                        for used_x, used_y in used_cells.get((cell_x, cell_y), ())
+                    ):
+                        break
+                
+                canvas.paste(img, (x, y))
+                used_cells.setdefault((x // cell_size, y // cell_size), []).append((x, y))
+                
+                # Create element record
+                element = CollageElement(
+                    image_id=image_info.id,
+                    position=ImagePosition(
+                        x=x,
+                        y=y,
+                        width=img.width,
+                        height=img.height
                     )
-                    elements.append(element)
+                )
+                elements.append(element)
             except Exception as e:
-                self.logger.error(f"Failed to load image {image_info.file_path}: {str(e)}")
+                self.logger.error("Failed to resize image %s: %s", image_info.file_path, e)
                 continue
         
         return canvas, elements
     
     async def _create_mosaic_collage(
         self,
-        images: List[ImageInfo],
+        images: List[Tuple[ImageInfo, Image.Image]],
         request: DesignRequest
     ) -> Tuple[Image.Image, List[CollageElement]]:
         """
         Create a mosaic collage (small tiles).
         
         Args:
-            images: List of processed images
+            images: (info, image) pairs for the processed images
             request: Design request
             
         Returns:
@@ -479,7 +593,7 @@ class CollageGenerator:
         width, height = request.output_width, request.output_height
         
         # Create canvas
-        canvas = Image.new("RGB", (width, height), request.background_color)
+        canvas = self._new_canvas(request)
         
         if not images:
             return canvas, []
@@ -487,39 +601,38 @@ class CollageGenerator:
         # Calculate tile size
         tile_size = min(width, height) // 10  # 10x10 grid
         
+        # One tile per image, filled row by row until the canvas runs out
+        positions = [
+            (x, y)
+            for y in range(0, height, tile_size)
+            for x in range(0, width, tile_size)
+        ]
+        placed = images[:len(positions)]
+        
+        # Resize all tiles up front
+        tiles = await self._fit_all(placed, (tile_size, tile_size))
+        
         elements = []
-        image_index = 0
         
         # Create mosaic pattern
-        for y in range(0, height, tile_size):
-            for x in range(0, width, tile_size):
-                if image_index < len(images):
-                    image_info = images[image_index]
-                    
-                    # Load and resize image - use the processed image path
-                    try:
-                        with Image.open(image_info.file_path) as img:
-                            img.thumbnail((tile_size, tile_size), Image.Resampling.LANCZOS)
-                            
-                            canvas.paste(img, (x, y))
-                            
-                            # Create element record
-                            element = CollageElement(
-                                image_id=image_info.id,
-                                position=ImagePosition(
-                                    x=x,
-                                    y=y,
-                                    width=img.width,
-                                    height=img.height
-                                )
-                            )
-                            elements.append(element)
-                            
-                            image_index += 1
-                    except Exception as e:
-                        self.logger.error(f"Failed to load image {image_info.file_path}: {str(e)}")
-                        image_index += 1
-                        continue
+        for (x, y), (image_info, img) in zip(positions, tiles):
+            if isinstance(img, Exception):
+                self.logger.error("Failed to resize image %s: %s", image_info.file_path, img)
+                continue
+            
+            canvas.paste(img, (x, y))
+            
+            # Create element record
+            element = CollageElement(
+                image_id=image_info.id,
+                position=ImagePosition(
+                    x=x,
+                    y=y,
+                    width=img.width,
+                    height=img.height
+                )
+            )
+            elements.append(element)
         
         return canvas, elements
     
@@ -542,11 +655,14 @@ class CollageGenerator:
         Returns:
             Path to saved collage
         """
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        timestamp = utc_now().strftime("%Y%m%d_%H%M%S")
         filename = f"collage_{task_id}_{timestamp}.jpg"
         file_path = os.path.join(self.output_directory, filename)
         
-        # Save with high quality
-        collage_image.save(file_path, "JPEG", quality=95, optimize=True)
+        # Single-pass encode: the optimized Huffman pass roughly doubles
+        # encode time for a few percent of file size. A large write buffer
+        # lets a multi-megabyte JPEG reach the disk in a few write calls.
+        with open(file_path, "wb", buffering=SAVE_BUFFER_SIZE) as f:
+            collage_image.save(f, "JPEG", quality=90, subsampling=2, progressive=False)
         
         return file_path
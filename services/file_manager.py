@@ -5,18 +5,78 @@ This module provides functionality for managing file uploads,
 downloads, and storage operations.
 """
 
+import asyncio
+import hashlib
 import os
-import shutil
 import logging
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Optional, Dict, Any
-from uuid import UUID, uuid4
+from typing import Any, BinaryIO, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
 from pathlib import Path
 
+import aiofiles.os
 from fastapi import UploadFile
 from PIL import Image
 
+from config.settings import SUPPORTED_EXTENSIONS
 from models.task_models import ImageInfo, ImageFormat
+from utils.clock import utc_now
+
+
+# Bytes copied per iteration when an in-memory upload is written to disk
+UPLOAD_CHUNK_SIZE = 128 * 1024
+
+# Content types accepted for each supported extension
+CONTENT_TYPES_BY_EXTENSION: Dict[str, str] = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp"
+}
+
+# Image format recorded for each supported extension
+FORMATS_BY_EXTENSION: Dict[str, ImageFormat] = {
+    ".jpg": ImageFormat.JPEG,
+    ".jpeg": ImageFormat.JPEG,
+    ".png": ImageFormat.PNG,
+    ".gif": ImageFormat.GIF,
+    ".webp": ImageFormat.WEBP
+}
+
+# Content types sent by clients that don't label file parts; the file header is checked instead
+GENERIC_CONTENT_TYPES = frozenset({"", "application/octet-stream"})
+
+# Full file signatures of the accepted image formats, keyed by their first four bytes.
+# JPEG's fourth byte varies by marker and RIFF only becomes WebP at offset 8, so
+# both are checked separately.
+IMAGE_SIGNATURES: Dict[bytes, Tuple[bytes, ...]] = {
+    b"\x89PNG": (b"\x89PNG\r\n\x1a\n",),
+    b"GIF8": (b"GIF87a", b"GIF89a")
+}
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+# Bounds of the cache of recently confirmed file paths
+EXISTS_CACHE_SIZE = 4096
+EXISTS_CACHE_TTL_SECONDS = 5.0
+
+
+class DirectorySummary(NamedTuple):
+    """Totals for the files directly inside one directory."""
+    mtime_ns: int
+    file_count: int
+    total_bytes: int
+    files_by_mtime: Tuple[Tuple[float, str], ...]  # (mtime, path), oldest first
+    subdirectories: Tuple[str, ...]
+
+
+class WrittenUpload(NamedTuple):
+    """What was learned while copying an upload to disk."""
+    sha256: str
+    size_bytes: int
+    width: int
+    height: int
 
 
 class FileManager:
@@ -28,7 +88,8 @@ class FileManager:
         self,
         upload_directory: str = "uploads",
         max_file_size_mb: int = 10,
-        allowed_extensions: List[str] = None
+        allowed_extensions: Optional[Iterable[str]] = None,
+        max_concurrent_uploads: int = 8
     ):
         """
         Initialize the file manager.
@@ -36,30 +97,45 @@ class FileManager:
         Args:
             upload_directory: Directory for uploaded files
             max_file_size_mb: Maximum file size in MB
-            allowed_extensions: List of allowed file extensions
+            allowed_extensions: Allowed file extensions (case-insensitive)
+            max_concurrent_uploads: Maximum uploads written to disk at once
         """
         self.upload_directory = upload_directory
         self.max_file_size_bytes = max_file_size_mb * 1024 * 1024
-        self.allowed_extensions = allowed_extensions or [".jpg", ".jpeg", ".png", ".gif", ".webp"]
+        self.allowed_extensions: FrozenSet[str] = (
+            frozenset(ext.lower() for ext in allowed_extensions)
+            if allowed_extensions
+            else SUPPORTED_EXTENSIONS
+        )
+        self.allowed_content_types = frozenset(
+            CONTENT_TYPES_BY_EXTENSION[ext]
+            for ext in self.allowed_extensions
+            if ext in CONTENT_TYPES_BY_EXTENSION
+        )
         
         self.logger = logging.getLogger("file_manager")
         
+        # Caps disk writes across all requests so large batches can't
+        # exhaust worker threads or file descriptors
+        self._upload_slots = asyncio.Semaphore(max_concurrent_uploads)
+        
+        # Paths recently seen on disk, mapped to the monotonic time they were checked
+        self._exists_cache: "OrderedDict[str, float]" = OrderedDict()
+        
+        # Per-directory totals, reused while the directory's mtime is unchanged
+        self._directory_summaries: Dict[str, DirectorySummary] = {}
+        
+        # User directories already created, so uploads skip os.makedirs
+        self._known_directories: Set[str] = set()
+        
         # Create upload directory if it doesn't exist
         os.makedirs(upload_directory, exist_ok=True)
-        
-        # Extension to format mapping
-        self.extension_to_format = {
-            ".jpg": ImageFormat.JPEG,
-            ".jpeg": ImageFormat.JPEG,
-            ".png": ImageFormat.PNG,
-            ".gif": ImageFormat.GIF,
-            ".webp": ImageFormat.WEBP
-        }
     
     async def save_uploaded_file(
         self,
         file: UploadFile,
-        user_id: Optional[str] = None
+        user_id: Optional[str] = None,
+        uploaded_at: Optional[datetime] = None
     ) -> ImageInfo:
         """
         Save an uploaded file and return image information.
@@ -67,6 +143,7 @@ class FileManager:
         Args:
             file: Uploaded file
             user_id: Optional user ID for organization
+            uploaded_at: Upload time to record; defaults to now
             
         Returns:
             ImageInfo object with file details
@@ -76,37 +153,42 @@ class FileManager:
             Exception: If file saving fails
         """
         # Validate file
-        await self._validate_file(file)
-        
-        # Generate unique filename
-        timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        file_id = uuid4()
+        file_extension = await self._validate_file(file)
         
-        # Get file extension
-        file_extension = Path(file.filename).suffix.lower()
-        if file_extension not in self.allowed_extensions:
-            raise ValueError(f"File extension {file_extension} not allowed")
+        uploaded_at = uploaded_at or utc_now()
         
-        # Generate filename
-        filename = f"{file_id}_{timestamp}{file_extension}"
+        # Generate a unique filename: 64 random bits plus the write time in ns
+        filename = f"{os.urandom(8).hex()}_{time.time_ns()}{file_extension}"
         
         # Create user-specific directory if user_id provided
         if user_id:
             user_dir = os.path.join(self.upload_directory, user_id)
-            os.makedirs(user_dir, exist_ok=True)
+            if user_dir not in self._known_directories:
+                os.makedirs(user_dir, exist_ok=True)
+                self._known_directories.add(user_dir)
             file_path = os.path.join(user_dir, filename)
         else:
             file_path = os.path.join(self.upload_directory, filename)
         
         try:
-            # Save file
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            # Copy to disk off the event loop, enforcing the size limit, hashing
+            # and reading the dimensions from the upload's own spool
+            async with self._upload_slots:
+                written = await asyncio.to_thread(self._write_upload, file.file, file_path)
+            self._directory_summaries.pop(os.path.dirname(file_path), None)
             
-            # Get image information
-            image_info = await self._get_image_info(file_path, filename)
+            image_info = ImageInfo(
+                filename=filename,
+                format=FORMATS_BY_EXTENSION.get(file_extension, ImageFormat.JPEG),
+                width=written.width,
+                height=written.height,
+                size_bytes=written.size_bytes,
+                file_path=file_path,
+                sha256=written.sha256,
+                upload_timestamp=uploaded_at
+            )
             
-            self.logger.info(f"Saved uploaded file: {filename}")
+            self.logger.info("Saved uploaded file: %s", filename)
             return image_info
             
         except Exception as e:
@@ -115,6 +197,78 @@ class FileManager:
                 os.remove(file_path)
             raise Exception(f"Failed to save uploaded file: {str(e)}")
     
+    def _write_upload(self, source: BinaryIO, file_path: str) -> WrittenUpload:
+        """
+        Copy an upload's spooled body to disk. Runs in a worker thread.
+        
+        Bodies Starlette has rolled over to a temporary file are copied
+        kernel-to-kernel with os.sendfile; in-memory bodies go through a
+        buffered read/write loop. The dimensions are then parsed from the
+        spool rather than by reopening the copy.
+        
+        Args:
+            source: The upload's underlying file object
+            file_path: Destination path
+            
+        Returns:
+            WrittenUpload with the digest, size and dimensions
+            
+        Raises:
+            ValueError: If the file is too large
+        """
+        source.seek(0)
+        in_fd = self._spooled_fileno(source)
+        
+        with open(file_path, "wb") as out:
+            if in_fd is not None:
+                size = os.fstat(in_fd).st_size
+                if size > self.max_file_size_bytes:
+                    raise ValueError(f"File too large. Maximum size: {self.max_file_size_bytes} bytes")
+                
+                digest = hashlib.file_digest(source, "sha256")
+                offset = 0
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), in_fd, offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            else:
+                digest = hashlib.sha256()
+                size = 0
+                while chunk := source.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_file_size_bytes:
+                        raise ValueError(f"File too large. Maximum size: {self.max_file_size_bytes} bytes")
+                    digest.update(chunk)
+                    out.write(chunk)
+        
+        # Only the header is parsed; the pixels are never decoded here
+        source.seek(0)
+        with Image.open(source) as img:
+            width, height = img.size
+        
+        return WrittenUpload(digest.hexdigest(), size, width, height)
+    
+    @staticmethod
+    def _spooled_fileno(source: BinaryIO) -> Optional[int]:
+        """
+        Get the descriptor of an upload spooled to disk, if it has one.
+        
+        Args:
+            source: The upload's underlying file object
+            
+        Returns:
+            File descriptor, or None for in-memory bodies or without sendfile
+        """
+        # Same check Starlette makes: fileno() on an in-memory spool would
+        # force it to roll over to disk
+        if not hasattr(os, "sendfile") or not getattr(source, "_rolled", True):
+            return None
+        try:
+            return source.fileno()
+        except (AttributeError, OSError):
+            return None
+    
     async def save_multiple_files(
         self,
         files: List[UploadFile],
@@ -136,19 +290,41 @@ class FileManager:
         saved_files = []
         failed_files = []
         
-        for file in files:
-            try:
-                image_info = await self.save_uploaded_file(file, user_id)
-                saved_files.append(image_info)
-            except Exception as e:
-                self.logger.error(f"Failed to save file {file.filename}: {str(e)}")
+        # Save all files concurrently; results keep the upload order and
+        # share one upload time
+        uploaded_at = utc_now()
+        results = await asyncio.gather(
+            *(self.save_uploaded_file(file, user_id, uploaded_at) for file in files),
+            return_exceptions=True
+        )
+        
+        for file, result in zip(files, results):
+            if isinstance(result, Exception):
+                self.logger.error("Failed to save file %s: %s", file.filename, result)
                 failed_files.append(file.filename)
+            else:
+                saved_files.append(result)
         
         if failed_files:
-            self.logger.warning(f"Failed to save {len(failed_files)} files: {failed_files}")
+            self.logger.warning("Failed to save %s files: %s", len(failed_files), failed_files)
         
         return saved_files
     
+    def is_allowed_content_type(self, content_type: Optional[str]) -> bool:
+        """
+        Check a client-declared content type against the allowed image types.
+        
+        Args:
+            content_type: Content type of an uploaded file part
+            
+        Returns:
+            True if the type is allowed or too generic to judge
+        """
+        if not content_type:
+            return True
+        content_type = content_type.split(";", 1)[0].strip().lower()
+        return content_type in GENERIC_CONTENT_TYPES or content_type in self.allowed_content_types
+    
     async def get_file_path(self, image_info: ImageInfo) -> str:
         """
         Get the full file path for an image.
@@ -171,7 +347,23 @@ class FileManager:
         Returns:
             True if file exists, False otherwise
         """
-        return os.path.exists(file_path)
+        now = time.monotonic()
+        checked_at = self._exists_cache.get(file_path)
+        if checked_at is not None and now - checked_at < EXISTS_CACHE_TTL_SECONDS:
+            return True
+        
+        # Stat in a worker thread so concurrent checks don't block the loop
+        exists = await aiofiles.os.path.exists(file_path)
+        
+        # Only hits are cached, so a file that appears later is never reported missing
+        if exists:
+            self._exists_cache[file_path] = now
+            self._exists_cache.move_to_end(file_path)
+            if len(self._exists_cache) > EXISTS_CACHE_SIZE:
+                self._exists_cache.popitem(last=False)
+        else:
+            self._exists_cache.pop(file_path, None)
+        return exists
     
     async def delete_file(self, file_path: str) -> bool:
         """
@@ -183,14 +375,16 @@ class FileManager:
         Returns:
             True if file was deleted, False otherwise
         """
+        self._exists_cache.pop(file_path, None)
+        self._directory_summaries.pop(os.path.dirname(file_path), None)
         try:
             if os.path.exists(file_path):
                 os.remove(file_path)
-                self.logger.info(f"Deleted file: {file_path}")
+                self.logger.info("Deleted file: %s", file_path)
                 return True
             return False
         except Exception as e:
-            self.logger.error(f"Failed to delete file {file_path}: {str(e)}")
+            self.logger.error("Failed to delete file %s: %s", file_path, e)
             return False
     
     async def cleanup_old_files(self, days_old: int = 7) -> int:
@@ -204,21 +398,21 @@ class FileManager:
             Number of files deleted
         """
         deleted_count = 0
-        cutoff_time = datetime.utcnow().timestamp() - (days_old * 24 * 60 * 60)
+        cutoff_time = time.time() - (days_old * 24 * 60 * 60)
         
         try:
-            for root, dirs, files in os.walk(self.upload_directory):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if os.path.getmtime(file_path) < cutoff_time:
-                        if await self.delete_file(file_path):
-                            deleted_count += 1
+            old_files = await asyncio.to_thread(
+                self._find_old_files, self.upload_directory, cutoff_time
+            )
+            for file_path in old_files:
+                if await self.delete_file(file_path):
+                    deleted_count += 1
             
-            self.logger.info(f"Cleaned up {deleted_count} old files")
+            self.logger.info("Cleaned up %s old files", deleted_count)
             return deleted_count
             
         except Exception as e:
-            self.logger.error(f"Failed to cleanup old files: {str(e)}")
+            self.logger.error("Failed to cleanup old files: %s", e)
             return deleted_count
     
     async def get_storage_stats(self) -> Dict[str, Any]:
@@ -228,15 +422,10 @@ class FileManager:
         Returns:
             Dictionary with storage statistics
         """
-        total_files = 0
-        total_size = 0
-        
         try:
-            for root, dirs, files in os.walk(self.upload_directory):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    total_files += 1
-                    total_size += os.path.getsize(file_path)
+            total_files, total_size = await asyncio.to_thread(
+                self._directory_totals, self.upload_directory
+            )
             
             return {
                 "total_files": total_files,
@@ -247,7 +436,7 @@ class FileManager:
             }
             
         except Exception as e:
-            self.logger.error(f"Failed to get storage stats: {str(e)}")
+            self.logger.error("Failed to get storage stats: %s", e)
             return {
                 "total_files": 0,
                 "total_size_bytes": 0,
@@ -256,75 +445,146 @@ class FileManager:
                 "max_file_size_mb": self.max_file_size_bytes // (1024 * 1024)
             }
     
-    async def _validate_file(self, file: UploadFile) -> None:
+    def _summarize_directory(self, directory: str) -> DirectorySummary:
+        """
+        Summarize the files directly inside a directory. Runs in a worker thread.
+        
+        Adding, removing or renaming an entry bumps the directory's mtime, so
+        a cached summary is reused for as long as the mtime matches; uploads
+        and deletions through this manager also drop the entry explicitly.
+        One listing serves both storage stats and cleanup.
+        
+        Args:
+            directory: Directory to summarize
+            
+        Returns:
+            DirectorySummary for the directory
+        """
+        mtime_ns = os.stat(directory).st_mtime_ns
+        cached = self._directory_summaries.get(directory)
+        if cached is not None and cached.mtime_ns == mtime_ns:
+            return cached
+        
+        total_bytes = 0
+        files_by_mtime = []
+        subdirectories = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirectories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    total_bytes += stat.st_size
+                    files_by_mtime.append((stat.st_mtime, entry.path))
+        files_by_mtime.sort()
+        
+        summary = DirectorySummary(
+            mtime_ns, len(files_by_mtime), total_bytes, tuple(files_by_mtime), tuple(subdirectories)
+        )
+        self._directory_summaries[directory] = summary
+        return summary
+    
+    def _directory_totals(self, directory: str) -> Tuple[int, int]:
+        """
+        Count files and bytes under a directory tree. Runs in a worker thread.
+        
+        Args:
+            directory: Root of the tree
+            
+        Returns:
+            Tuple of (file count, total bytes)
+        """
+        summary = self._summarize_directory(directory)
+        file_count, total_bytes = summary.file_count, summary.total_bytes
+        for subdirectory in summary.subdirectories:
+            sub_count, sub_bytes = self._directory_totals(subdirectory)
+            file_count += sub_count
+            total_bytes += sub_bytes
+        return file_count, total_bytes
+    
+    def _find_old_files(self, directory: str, cutoff_time: float) -> List[str]:
+        """
+        List files under a directory tree last modified before a cutoff.
+        
+        Candidates come from the cached directory summaries; each is stat'ed
+        again before being returned in case it was rewritten in place since
+        the directory was listed. Runs in a worker thread.
+        
+        Args:
+            directory: Root of the tree
+            cutoff_time: Epoch seconds; older files are returned
+            
+        Returns:
+            Paths of the old files
+        """
+        summary = self._summarize_directory(directory)
+        old_files = []
+        for mtime, file_path in summary.files_by_mtime:
+            if mtime >= cutoff_time:
+                break
+            try:
+                if os.stat(file_path, follow_symlinks=False).st_mtime < cutoff_time:
+                    old_files.append(file_path)
+            except FileNotFoundError:
+                continue
+        for subdirectory in summary.subdirectories:
+            old_files.extend(self._find_old_files(subdirectory, cutoff_time))
+        return old_files
+    
+    async def _validate_file(self, file: UploadFile) -> str:
         """
         Validate uploaded file.
         
         Args:
             file: Uploaded file
             
+        Returns:
+            The file's lower-cased extension
+            
         Raises:
             ValueError: If file is invalid
         """
         # Check file size
-        if hasattr(file, 'size') and file.size > self.max_file_size_bytes:
+        if getattr(file, 'size', None) is not None and file.size > self.max_file_size_bytes:
             raise ValueError(f"File too large. Maximum size: {self.max_file_size_bytes} bytes")
         
         # Check file extension
-        if file.filename:
-            file_extension = Path(file.filename).suffix.lower()
-            if file_extension not in self.allowed_extensions:
-                raise ValueError(f"File extension {file_extension} not allowed")
+        file_extension = Path(file.filename or "").suffix.lower()
+        if file_extension not in self.allowed_extensions:
+            raise ValueError(f"File extension {file_extension} not allowed")
         
         # Check if it's a valid image
         try:
-            # Read first few bytes to check image header
+            # Read the first bytes to check the image header; _write_upload
+            # rewinds before copying, so the position isn't reset here
             file.file.seek(0)
-            header = file.file.read(10)
-            file.file.seek(0)  # Reset position
+            header = file.file.read(16)
             
-            # Check for common image file signatures
-            if not (header.startswith(b'\xff\xd8\xff') or  # JPEG
-                    header.startswith(b'\x89PNG\r\n\x1a\n') or  # PNG
-                    header.startswith(b'GIF87a') or  # GIF
-                    header.startswith(b'GIF89a') or  # GIF
-                    header.startswith(b'RIFF') and b'WEBP' in header):  # WEBP
+            if not self._has_image_signature(header):
                 raise ValueError("File does not appear to be a valid image")
                 
         except Exception as e:
             raise ValueError(f"Invalid image file: {str(e)}")
+        
+        return file_extension
     
-    async def _get_image_info(self, file_path: str, filename: str) -> ImageInfo:
+    @staticmethod
+    def _has_image_signature(header: bytes) -> bool:
         """
-        Get image information from file.
+        Check whether a file header starts with a supported image signature.
         
         Args:
-            file_path: Path to image file
-            filename: Original filename
+            header: The first 16 bytes of the file
             
         Returns:
-            ImageInfo object
+            True for JPEG, PNG, GIF and WebP headers
         """
-        try:
-            with Image.open(file_path) as img:
-                # Get file extension
-                file_extension = Path(filename).suffix.lower()
-                image_format = self.extension_to_format.get(file_extension, ImageFormat.JPEG)
-                
-                # Get file size
-                file_size = os.path.getsize(file_path)
-                
-                return ImageInfo(
-                    filename=filename,
-                    format=image_format,
-                    width=img.width,
-                    height=img.height,
-                    size_bytes=file_size,
-                    file_path=file_path
-                )
-                
-        except Exception as e:
-            raise Exception(f"Failed to get image info: {str(e)}")
+        if header.startswith(JPEG_SIGNATURE):
+            return True
+        prefix = header[:4]
+        if prefix == b"RIFF":
+            return header[8:12] == b"WEBP"
+        return header.startswith(IMAGE_SIGNATURES.get(prefix, ()))
     
     async def create_thumbnail(
         self,
@@ -342,18 +602,48 @@ class FileManager:
             Path to thumbnail file
         """
         thumbnail_dir = os.path.join(self.upload_directory, "thumbnails")
-        os.makedirs(thumbnail_dir, exist_ok=True)
+        if thumbnail_dir not in self._known_directories:
+            os.makedirs(thumbnail_dir, exist_ok=True)
+            self._known_directories.add(thumbnail_dir)
         
         thumbnail_filename = f"thumb_{image_info.id}.jpg"
         thumbnail_path = os.path.join(thumbnail_dir, thumbnail_filename)
         
         try:
-            with Image.open(image_info.file_path) as img:
-                img.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
-                img.save(thumbnail_path, "JPEG", quality=85)
-            
+            await asyncio.to_thread(
+                self._write_thumbnail, image_info.file_path, thumbnail_path, thumbnail_size
+            )
             return thumbnail_path
             
         except Exception as e:
-            self.logger.error(f"Failed to create thumbnail: {str(e)}")
+            self.logger.error("Failed to create thumbnail: %s", e)
             raise
+    
+    @staticmethod
+    def _write_thumbnail(source_path: str, thumbnail_path: str, thumbnail_size: tuple) -> None:
+        """
+        Resize an image and save it as a JPEG thumbnail. Runs in a worker thread.
+        
+        Args:
+            source_path: Path of the image to shrink
+            thumbnail_path: Where to save the thumbnail
+            thumbnail_size: Size of thumbnail (width, height)
+        """
+        with Image.open(source_path) as img:
+            # thumbnail() already asks libjpeg for a draft at twice the target
+            # size (reducing_gap=2.0), so large JPEGs are never fully decoded
+            img.thumbnail(thumbnail_size, Image.Resampling.LANCZOS)
+            
+            # JPEG can't store alpha or palettes
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            
+            # Single-pass baseline 4:2:0 encode, as for collages
+            img.save(
+                thumbnail_path,
+                "JPEG",
+                quality=85,
+                optimize=False,
+                subsampling=2,
+                progressive=False
+            )
@@ -0,0 +1,568 @@
+"""
+Task storage backends for the design system API.
+
+This module provides an in-process store for single-worker deployments
+and a Redis-backed store that can be shared by several API workers.
+"""
+
+from abc import ABC, abstractmethod
+import asyncio
+import heapq
+import logging
+import time
+from collections import OrderedDict
+from itertools import count, islice
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Set, Tuple
+from uuid import UUID
+
+from models.task_models import Task, TaskStatus
+
+
+# Statuses after which a task is never modified again
+TERMINAL_STATUSES = frozenset({TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED})
+
+_EMPTY_INDEX: FrozenSet[UUID] = frozenset()
+
+_logger = logging.getLogger("task_store")
+
+
+class TaskStore(ABC):
+    """
+    Abstract interface for task persistence.
+    
+    Tasks are mutated in place by the routes and agents; callers must
+    call save() after every mutation so that shared backends see it.
+    """
+    
+    def __init__(self):
+        # Update queues of the callers currently watching each task
+        self._watchers: Dict[UUID, Set[asyncio.Queue]] = {}
+    
+    @abstractmethod
+    async def save(self, task: Task) -> None:
+        """
+        Create or update a task.
+        
+        Args:
+            task: The task to store
+        """
+        pass
+    
+    @abstractmethod
+    async def get(self, task_id: UUID) -> Optional[Task]:
+        """
+        Get a task by ID.
+        
+        Args:
+            task_id: Task ID
+        
+        Returns:
+            The task, or None if it doesn't exist
+        """
+        pass
+    
+    @abstractmethod
+    async def list(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Tuple[List[Task], int]:
+        """
+        List tasks in creation order with optional filtering.
+        
+        Args:
+            user_id: Filter by user ID
+            status: Filter by status
+            limit: Maximum number of tasks to return
+            offset: Number of matching tasks to skip
+        
+        Returns:
+            Tuple of (matching tasks, total number of stored tasks)
+        """
+        pass
+    
+    async def prune(self) -> int:
+        """
+        Drop expired tasks.
+        
+        Returns:
+            Number of tasks removed
+        """
+        return 0
+    
+    async def watch(
+        self,
+        task_id: UUID,
+        idle_timeout: Optional[float] = None
+    ) -> AsyncIterator[Optional[Task]]:
+        """
+        Follow a task until it reaches a terminal status.
+        
+        Yields the task as currently stored, then again after every saved
+        update. The watcher is registered before the first read, so no
+        update can slip in between.
+        
+        Args:
+            task_id: Task ID
+            idle_timeout: Seconds without an update after which None is
+                yielded, so callers can keep idle connections alive
+        
+        Yields:
+            The task after each update, or None when idle
+        """
+        updates: asyncio.Queue = asyncio.Queue()
+        self._watchers.setdefault(task_id, set()).add(updates)
+        try:
+            await self._start_watching()
+            task = await self.get(task_id)
+            while task is not None:
+                yield task
+                if task.status in TERMINAL_STATUSES:
+                    return
+                
+                try:
+                    task = await asyncio.wait_for(updates.get(), idle_timeout)
+                except asyncio.TimeoutError:
+                    yield None
+                    task = await self.get(task_id)
+        finally:
+            _discard_from_index(self._watchers, task_id, updates)
+    
+    async def _start_watching(self) -> None:
+        """Prepare the backend to deliver updates to watch(); called on every watch."""
+        pass
+    
+    def _notify(self, task: Task) -> None:
+        """Hand an updated task to everyone watching it."""
+        for updates in self._watchers.get(task.id, ()):
+            updates.put_nowait(task)
+    
+    async def close(self) -> None:
+        """Release any resources held by the store."""
+        pass
+
+
+class InMemoryTaskStore(TaskStore):
+    """
+    Task store backed by a process-local dictionary.
+    
+    Only suitable for a single API worker; tasks are lost on restart.
+    User and status indices are maintained on save() so filtered listings
+    only touch matching tasks. Finished tasks are evicted once they exceed
+    the retention period, or oldest-finished first when the store is full.
+    """
+    
+    def __init__(self, max_tasks: int = 1000, retention_seconds: int = 3600):
+        """
+        Initialize the in-memory task store.
+        
+        Args:
+            max_tasks: Number of tasks kept before finished ones are evicted
+            retention_seconds: How long finished tasks are kept
+        """
+        super().__init__()
+        self.max_tasks = max_tasks
+        self.retention_seconds = retention_seconds
+        
+        self._tasks: Dict[UUID, Task] = {}
+        
+        # Secondary indices and the (user_id, status) each task is indexed under
+        self._by_user: Dict[str, Set[UUID]] = {}
+        self._by_status: Dict[TaskStatus, Set[UUID]] = {}
+        self._indexed_as: Dict[UUID, Tuple[Optional[str], TaskStatus]] = {}
+        
+        # Creation sequence, used to return filtered results in insertion order
+        self._sequence: Dict[UUID, int] = {}
+        self._next_sequence = count()
+        
+        # Finished task IDs in the order they finished, with monotonic finish times
+        self._finished: "OrderedDict[UUID, float]" = OrderedDict()
+    
+    async def save(self, task: Task) -> None:
+        if task.id not in self._tasks:
+            self._sequence[task.id] = next(self._next_sequence)
+        self._tasks[task.id] = task
+        
+        index_key = (task.user_id, task.status)
+        previous = self._indexed_as.get(task.id)
+        if previous != index_key:
+            if previous is not None:
+                self._unindex(task.id, previous)
+            
+            if task.user_id:
+                self._by_user.setdefault(task.user_id, set()).add(task.id)
+            self._by_status.setdefault(task.status, set()).add(task.id)
+            self._indexed_as[task.id] = index_key
+            
+            if task.status in TERMINAL_STATUSES:
+                self._finished[task.id] = time.monotonic()
+            else:
+                self._finished.pop(task.id, None)
+        
+        if len(self._tasks) > self.max_tasks:
+            self._evict()
+        
+        self._notify(task)
+    
+    async def prune(self) -> int:
+        return self._evict()
+    
+    def _evict(self) -> int:
+        """Evict expired finished tasks, then the oldest finished ones while over capacity."""
+        cutoff = time.monotonic() - self.retention_seconds
+        evicted = 0
+        while self._finished:
+            task_id, finished_at = next(iter(self._finished.items()))
+            if finished_at >= cutoff and len(self._tasks) <= self.max_tasks:
+                break
+            self._remove(task_id)
+            evicted += 1
+        return evicted
+    
+    def _remove(self, task_id: UUID) -> None:
+        """Remove a task and its index entries."""
+        del self._tasks[task_id]
+        del self._sequence[task_id]
+        self._finished.pop(task_id, None)
+        self._unindex(task_id, self._indexed_as.pop(task_id))
+    
+    def _unindex(self, task_id: UUID, index_key: Tuple[Optional[str], TaskStatus]) -> None:
+        """Remove a task ID from the indices it was stored under."""
+        user_id, status = index_key
+        if user_id:
+            _discard_from_index(self._by_user, user_id, task_id)
+        _discard_from_index(self._by_status, status, task_id)
+    
+    async def get(self, task_id: UUID) -> Optional[Task]:
+        return self._tasks.get(task_id)
+    
+    async def list(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Tuple[List[Task], int]:
+        # islice and heapq reject negative bounds
+        limit, offset = max(limit, 0), max(offset, 0)
+        
+        if not user_id and not status:
+            return list(islice(self._tasks.values(), offset, offset + limit)), len(self._tasks)
+        
+        # Intersect the index sets, smallest first
+        candidates = [
+            index.get(key, _EMPTY_INDEX)
+            for index, key in ((self._by_user, user_id), (self._by_status, status))
+            if key
+        ]
+        candidates.sort(key=len)
+        task_ids = candidates[0].intersection(*candidates[1:])
+        
+        # Only the page being returned needs ordering
+        page = heapq.nsmallest(offset + limit, task_ids, key=self._sequence.__getitem__)[offset:]
+        return [self._tasks[task_id] for task_id in page], len(self._tasks)
+
+
+def _discard_from_index(index: Dict[Any, Set[UUID]], key: Any, task_id: UUID) -> None:
+    """Remove a task ID from an index entry, dropping the entry once empty."""
+    task_ids = index.get(key)
+    if task_ids is not None:
+        task_ids.discard(task_id)
+        if not task_ids:
+            del index[key]
+
+
+class RedisTaskStore(TaskStore):
+    """
+    Task store backed by Redis, shareable between API workers.
+    
+    Each task is a hash holding its JSON document plus the indexed fields.
+    Sorted sets scored by creation time index all tasks, tasks per user and
+    tasks per status, so filtered listings keep creation order. Finished
+    tasks are also listed in a "finished" sorted set scored by the time
+    their hash expires, as "task_id:status:user_id", so prune() can drop
+    them from every index once the hash is gone.
+    """
+    
+    # Writes the task hash, moves it between index sets and announces status
+    # changes on the events channel atomically, in a single round trip.
+    # KEYS[1] = task hash; ARGV = data, status, user_id, score, task_id, key prefix,
+    # ttl, expiry timestamp
+    _SAVE_SCRIPT = """
+local prefix = ARGV[6]
+local old = redis.call('HMGET', KEYS[1], 'status', 'user_id')
+redis.call('HSET', KEYS[1], 'data', ARGV[1], 'status', ARGV[2], 'user_id', ARGV[3])
+if old[1] then
+    redis.call('ZREM', prefix .. 'finished', ARGV[5] .. ':' .. old[1] .. ':' .. (old[2] or ''))
+end
+if old[1] and old[1] ~= ARGV[2] then
+    redis.call('ZREM', prefix .. 'status:' .. old[1], ARGV[5])
+end
+if old[2] and old[2] ~= '' and old[2] ~= ARGV[3] then
+    redis.call('ZREM', prefix .. 'user:' .. old[2], ARGV[5])
+end
+redis.call('ZADD', prefix .. 'status:' .. ARGV[2], ARGV[4], ARGV[5])
+if ARGV[3] ~= '' then
+    redis.call('ZADD', prefix .. 'user:' .. ARGV[3], ARGV[4], ARGV[5])
+end
+redis.call('ZADD', prefix .. 'all', ARGV[4], ARGV[5])
+if tonumber(ARGV[7]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[7])
+    redis.call('ZADD', prefix .. 'finished', ARGV[8], ARGV[5] .. ':' .. ARGV[2] .. ':' .. ARGV[3])
+end
+if old[1] ~= ARGV[2] then
+    redis.call('PUBLISH', prefix .. 'events', ARGV[5] .. ':' .. ARGV[2])
+end
+return 1
+"""
+    
+    # Removes tasks whose hash has expired from every index set.
+    # ARGV = key prefix, current timestamp, maximum number of tasks to check
+    _PRUNE_SCRIPT = """
+local prefix = ARGV[1]
+local members = redis.call('ZRANGEBYSCORE', prefix .. 'finished', '-inf', ARGV[2], 'LIMIT', 0, ARGV[3])
+local removed = 0
+for _, member in ipairs(members) do
+    local task_id, status, user_id = string.match(member, '^([^:]*):([^:]*):(.*)$')
+    if redis.call('EXISTS', prefix .. 'task:' .. task_id) == 0 then
+        redis.call('ZREM', prefix .. 'all', task_id)
+        redis.call('ZREM', prefix .. 'status:' .. status, task_id)
+        if user_id ~= '' then
+            redis.call('ZREM', prefix .. 'user:' .. user_id, task_id)
+        end
+        redis.call('ZREM', prefix .. 'finished', member)
+        removed = removed + 1
+    end
+end
+return removed
+"""
+    
+    # Finished tasks checked per prune round trip
+    PRUNE_BATCH_SIZE = 1000
+    
+    def __init__(
+        self,
+        redis_url: str,
+        key_prefix: str = "tasks:",
+        local_cache_size: int = 1024,
+        retention_seconds: int = 3600,
+        max_connections: int = 10,
+        pool_timeout_seconds: float = 5.0
+    ):
+        """
+        Initialize the Redis task store.
+        
+        Args:
+            redis_url: Redis connection URL
+            key_prefix: Prefix for all keys written by this store
+            local_cache_size: Number of finished tasks kept in process memory
+            retention_seconds: How long finished task hashes are kept before expiring
+            max_connections: Size of the connection pool
+            pool_timeout_seconds: How long a caller waits for a free connection
+        """
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise ImportError("The redis package is required when redis_url is set") from e
+        
+        super().__init__()
+        
+        # A blocking pool queues callers once every connection is busy instead of
+        # failing, so bursts of requests can't exhaust the server's client slots
+        self._pool = redis.BlockingConnectionPool.from_url(
+            redis_url,
+            max_connections=max_connections,
+            timeout=pool_timeout_seconds,
+            decode_responses=True
+        )
+        self._redis = redis.Redis(connection_pool=self._pool)
+        self._prefix = key_prefix
+        self._save_script = self._redis.register_script(self._SAVE_SCRIPT)
+        self._prune_script = self._redis.register_script(self._PRUNE_SCRIPT)
+        
+        # Finished tasks never change, so they can be served without a round trip
+        # until their hash expires; entries hold the monotonic time they were cached
+        self._local_cache: "OrderedDict[UUID, Tuple[Task, float]]" = OrderedDict()
+        self._local_cache_size = local_cache_size
+        self.retention_seconds = retention_seconds
+        
+        # One subscription to the events channel per process feeds every watcher
+        self._events_channel = f"{key_prefix}events"
+        self._events_listener: Optional[asyncio.Task] = None
+        self._events_lock = asyncio.Lock()
+    
+    def _task_key(self, task_id: UUID) -> str:
+        return f"{self._prefix}task:{task_id}"
+    
+    def _cache_if_final(self, task: Task) -> None:
+        if task.status in TERMINAL_STATUSES:
+            self._local_cache[task.id] = (task, time.monotonic())
+            self._local_cache.move_to_end(task.id)
+            if len(self._local_cache) > self._local_cache_size:
+                self._local_cache.popitem(last=False)
+    
+    async def save(self, task: Task) -> None:
+        ttl = self.retention_seconds if task.status in TERMINAL_STATUSES else 0
+        await self._save_script(
+            keys=[self._task_key(task.id)],
+            args=[
+                task.model_dump_json(),
+                task.status.value,
+                task.user_id or "",
+                task.created_at.timestamp(),
+                str(task.id),
+                self._prefix,
+                ttl,
+                time.time() + ttl
+            ]
+        )
+        self._cache_if_final(task)
+    
+    async def prune(self) -> int:
+        removed = 0
+        while True:
+            batch = await self._prune_script(
+                args=[self._prefix, time.time(), self.PRUNE_BATCH_SIZE]
+            )
+            removed += batch
+            if batch < self.PRUNE_BATCH_SIZE:
+                return removed
+    
+    async def get(self, task_id: UUID) -> Optional[Task]:
+        cached = self._local_cache.get(task_id)
+        if cached is not None:
+            task, cached_at = cached
+            if time.monotonic() - cached_at < self.retention_seconds:
+                return task
+            del self._local_cache[task_id]
+        
+        data = await self._redis.hget(self._task_key(task_id), "data")
+        if data is None:
+            return None
+        
+        task = Task.model_validate_json(data)
+        self._cache_if_final(task)
+        return task
+    
+    async def list(
+        self,
+        user_id: Optional[str] = None,
+        status: Optional[TaskStatus] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> Tuple[List[Task], int]:
+        # Negative bounds would index sorted sets from the end
+        limit, offset = max(limit, 0), max(offset, 0)
+        
+        # Drop expired tasks first so the page and the total only count live ones
+        await self.prune()
+        
+        index_keys = []
+        if user_id:
+            index_keys.append(f"{self._prefix}user:{user_id}")
+        if status:
+            index_keys.append(f"{self._prefix}status:{status.value}")
+        
+        tasks: List[Task] = []
+        while len(tasks) < limit:
+            start = offset + len(tasks)
+            wanted = limit - len(tasks)
+            if len(index_keys) == 2:
+                task_ids = (await self._redis.zinter(index_keys))[start:start + wanted]
+            else:
+                index_key = index_keys[0] if index_keys else f"{self._prefix}all"
+                task_ids = await self._redis.zrange(index_key, start, start + wanted - 1)
+            if not task_ids:
+                break
+            
+            # Fetch every task document in a single round trip
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for task_id in task_ids:
+                    pipe.hget(self._task_key(task_id), "data")
+                documents = await pipe.execute()
+            
+            expired_ids = []
+            for task_id, data in zip(task_ids, documents):
+                if data is None:
+                    expired_ids.append(task_id)
+                else:
+                    tasks.append(Task.model_validate_json(data))
+            
+            if not expired_ids:
+                break
+            
+            # A hash expired since the last prune; drop it from the indices just
+            # read, which moves the following tasks up to refill the page
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for index_key in (*index_keys, f"{self._prefix}all"):
+                    pipe.zrem(index_key, *expired_ids)
+                await pipe.execute()
+        
+        total = await self._redis.zcard(f"{self._prefix}all")
+        return tasks, total
+    
+    async def _start_watching(self) -> None:
+        if self._events_listener is not None and not self._events_listener.done():
+            return
+        
+        async with self._events_lock:
+            if self._events_listener is None or self._events_listener.done():
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self._events_channel)
+                self._events_listener = asyncio.create_task(self._listen_for_events(pubsub))
+    
+    async def _listen_for_events(self, pubsub) -> None:
+        """Reload watched tasks whenever a status change is published."""
+        try:
+            async for message in pubsub.listen():
+                task_id = UUID(message["data"].partition(":")[0])
+                if task_id in self._watchers:
+                    task = await self.get(task_id)
+                    if task is not None:
+                        self._notify(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # The next watch() resubscribes; current watchers fall back to idle reloads
+            _logger.exception("Task event subscription failed")
+        finally:
+            await pubsub.aclose()
+    
+    async def close(self) -> None:
+        if self._events_listener is not None:
+            self._events_listener.cancel()
+            try:
+                await self._events_listener
+            except asyncio.CancelledError:
+                pass
+        await self._redis.aclose()
+        await self._pool.disconnect()
+
+
+def create_task_store(
+    redis_url: Optional[str] = None,
+    max_tasks: int = 1000,
+    retention_seconds: int = 3600,
+    max_connections: int = 10
+) -> TaskStore:
+    """
+    Create the task store for the configured backend.
+    
+    Args:
+        redis_url: Redis connection URL; an in-memory store is used if unset
+        max_tasks: Capacity of the in-memory store
+        retention_seconds: How long finished tasks are kept
+        max_connections: Size of the Redis connection pool
+    
+    Returns:
+        TaskStore instance
+    """
+    if redis_url:
+        return RedisTaskStore(
+            redis_url,
+            retention_seconds=retention_seconds,
+            max_connections=max_connections
+        )
+    return InMemoryTaskStore(max_tasks=max_tasks, retention_seconds=retention_seconds)
@@ -0,0 +1,41 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import io
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import main
+from api import routes
+
+
+def make_jpeg(color=(200, 40, 40), size=(120, 80)) -> bytes:
+    """Encode a solid-colour JPEG in memory."""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def wait_for_status(client: TestClient, task_id: str, statuses, timeout: float = 30.0) -> dict:
+    """Poll a task until it reaches one of the given statuses."""
+    deadline = time.monotonic() + timeout
+    while True:
+        task = client.get(f"/api/v1/task/{task_id}").json()["task"]
+        if task["status"] in statuses or time.monotonic() > deadline:
+            return task
+        time.sleep(0.05)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """A running app whose upload, output and log files live in a temp directory."""
+    monkeypatch.chdir(tmp_path)
+    routes.get_file_manager.cache_clear()
+    routes.get_storage_stats.cache_clear()
+    with TestClient(main.create_app(), base_url="http://localhost") as test_client:
+        yield test_client
+    routes.get_file_manager.cache_clear()
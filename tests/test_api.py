@@ -0,0 +1,165 @@
+"""
+Tests for the REST API routes.
+"""
+
+import asyncio
+from uuid import uuid4
+
+import pytest
+from pydantic import ValidationError
+
+from api import routes
+from config.settings import Settings
+from models.task_models import AgentType, DesignSpecification, Task, TaskStatus
+from tests.conftest import make_jpeg, wait_for_status
+
+
+def upload(client, count=2, **data):
+    files = [
+        ("files", (f"image{i}.jpg", make_jpeg((i * 60, 80, 120)), "image/jpeg"))
+        for i in range(count)
+    ]
+    return client.post("/api/v1/upload/images", files=files, data=data)
+
+
+def test_upload_without_task_returns_images_only(client):
+    user_id = f"user-{uuid4()}"
+    response = upload(client, user_id=user_id, create_task="false")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["task_id"] is None
+    assert len(body["uploaded_images"]) == 2
+    assert client.get(f"/api/v1/tasks?user_id={user_id}").json()["tasks"] == []
+
+
+def test_upload_rejects_unsupported_content_type(client):
+    files = [("files", ("notes.txt", b"hello", "text/plain"))]
+    response = client.post("/api/v1/upload/images", files=files)
+
+    assert response.status_code == 415
+    assert "notes.txt" in response.json()["detail"]
+
+
+def test_upload_rejects_declared_size_over_limit(client, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPLOAD_BYTES", 100)
+
+    assert upload(client).status_code == 413
+
+
+def test_upload_rejects_oversized_request_body(client, monkeypatch):
+    monkeypatch.setattr(routes, "MAX_UPLOAD_BYTES", 0)
+    files = [("files", ("big.jpg", b"\xff\xd8\xff" + bytes(2 * 1024 * 1024), "image/jpeg"))]
+
+    assert client.post("/api/v1/upload/images", files=files).status_code == 413
+
+
+def test_upload_returns_503_when_design_queue_is_full(client, monkeypatch):
+    full_queue = asyncio.Queue(maxsize=1)
+    full_queue.put_nowait(uuid4())
+    monkeypatch.setattr(routes, "design_queue", full_queue)
+    user_id = f"user-{uuid4()}"
+
+    response = upload(client, user_id=user_id)
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    tasks = client.get(f"/api/v1/tasks?user_id={user_id}").json()["tasks"]
+    assert [task["status"] for task in tasks] == [TaskStatus.FAILED.value]
+
+
+def test_task_status_etag_revalidation(client):
+    task_id = upload(client).json()["task_id"]
+    wait_for_status(client, task_id, ("completed", "failed"))
+
+    response = client.get(f"/api/v1/task/{task_id}")
+    etag = response.headers["etag"]
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get(f"/api/v1/task/{task_id}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+    stale = client.get(f"/api/v1/task/{task_id}", headers={"If-None-Match": 'W/"pending-0"'})
+    assert stale.status_code == 200
+
+
+def test_task_status_etag_changes_with_status(client):
+    task = Task(agent_type=AgentType.DESIGN)
+    client.portal.call(routes.task_store.save, task)
+    first = client.get(f"/api/v1/task/{task.id}").headers["etag"]
+
+    task.update_status(TaskStatus.CANCELLED)
+    client.portal.call(routes.task_store.save, task)
+    response = client.get(f"/api/v1/task/{task.id}", headers={"If-None-Match": first})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != first
+    assert response.json()["task"]["status"] == "cancelled"
+
+
+def test_task_result_etag_revalidation(client):
+    task_id = upload(client).json()["task_id"]
+    assert wait_for_status(client, task_id, ("completed", "failed"))["status"] == "completed"
+
+    response = client.get(f"/api/v1/task/{task_id}/result")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["cache-control"] == "private, max-age=3600"
+
+    etag = response.headers["etag"]
+    revalidated = client.get(f"/api/v1/task/{task_id}/result", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+def test_list_tasks_rejects_negative_bounds(client):
+    assert client.get("/api/v1/tasks?offset=-1").status_code == 422
+    assert client.get("/api/v1/tasks?limit=-1").status_code == 422
+    assert client.get("/api/v1/tasks?limit=0").status_code == 422
+
+
+@pytest.mark.parametrize("color", ["red", "#fff", "rgb(1,2,3)", "#12345G"])
+def test_generate_rejects_non_hex_background_color(client, color):
+    images = upload(client, create_task="false").json()["uploaded_images"]
+
+    response = client.post(
+        "/api/v1/design/generate",
+        params={"background_color": color},
+        json=images
+    )
+
+    assert response.status_code == 422
+
+
+def test_generate_rejects_out_of_range_dimensions(client):
+    images = upload(client, create_task="false").json()["uploaded_images"]
+
+    response = client.post("/api/v1/design/generate?output_width=50", json=images)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["query", "output_width"]
+
+
+def test_generate_accepts_hex_background_color(client):
+    images = upload(client, create_task="false").json()["uploaded_images"]
+
+    response = client.post(
+        "/api/v1/design/generate",
+        params={"background_color": "#AbCdEf"},
+        json=images
+    )
+
+    assert response.status_code == 200
+    task = wait_for_status(client, response.json()["task"]["id"], ("completed", "failed"))
+    assert task["status"] == "completed"
+
+
+def test_settings_and_model_share_the_color_rule():
+    with pytest.raises(ValidationError):
+        Settings(default_background_color="red")
+    with pytest.raises(ValidationError):
+        DesignSpecification(background_color="red")
+
+    assert Settings(default_background_color="#336699").default_background_color == "#336699"
@@ -0,0 +1,42 @@
+"""
+Small caching helpers for hot, rarely-changing values.
+"""
+
+import functools
+import time
+from typing import Any, Awaitable, Callable
+
+
+def async_ttl_cache(ttl_seconds: float) -> Callable:
+    """
+    Cache the result of a no-argument coroutine function for a fixed time.
+    
+    The wrapped function gains a cache_clear() method to force a refresh.
+    
+    Args:
+        ttl_seconds: How long a computed result is reused
+        
+    Returns:
+        Decorator for the coroutine function
+    """
+    def decorator(func: Callable[[], Awaitable[Any]]) -> Callable[[], Awaitable[Any]]:
+        cached_value = None
+        expires_at = float("-inf")
+        
+        @functools.wraps(func)
+        async def wrapper() -> Any:
+            nonlocal cached_value, expires_at
+            if time.monotonic() >= expires_at:
+                cached_value = await func()
+                expires_at = time.monotonic() + ttl_seconds
+            return cached_value
+        
+        def cache_clear() -> None:
+            nonlocal cached_value, expires_at
+            cached_value = None
+            expires_at = float("-inf")
+        
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    
+    return decorator
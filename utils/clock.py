@@ -0,0 +1,11 @@
+"""
+Clock helpers shared by models and services.
+"""
+
+from datetime import datetime, timezone
+from functools import partial
+
+
+# Current time as an aware UTC datetime; bound once instead of looking up
+# datetime.now and timezone.utc on every model construction
+utc_now = partial(datetime.now, timezone.utc)
@@ -0,0 +1,53 @@
+"""
+Colour parsing helpers.
+"""
+
+import re
+from functools import lru_cache
+from typing import Tuple
+
+from PIL import ImageColor
+
+
+# The only colour format accepted in design specifications and settings
+HEX_COLOR_PATTERN = r"^#[0-9A-Fa-f]{6}$"
+_HEX_COLOR_RE = re.compile(HEX_COLOR_PATTERN)
+
+
+def is_hex_color(value: str) -> bool:
+    """
+    Check whether a string is a "#RRGGBB" colour.
+    
+    Args:
+        value: Colour string
+        
+    Returns:
+        True if the string matches HEX_COLOR_PATTERN
+    """
+    return _HEX_COLOR_RE.match(value) is not None
+
+
+@lru_cache(maxsize=256)
+def parse_color(value: str) -> Tuple[int, int, int]:
+    """
+    Parse a colour string into an RGB tuple.
+    
+    "#RRGGBB" strings are decoded directly; any other colour Pillow
+    understands (names, "#RGB", "rgb(...)") falls back to ImageColor.
+    Results are cached since the same few colours are used repeatedly.
+    
+    Args:
+        value: Colour string
+        
+    Returns:
+        RGB tuple
+        
+    Raises:
+        ValueError: If the colour can't be parsed
+    """
+    if len(value) == 7 and value[0] == "#":
+        try:
+            return (int(value[1:3], 16), int(value[3:5], 16), int(value[5:7], 16))
+        except ValueError:
+            pass
+    return ImageColor.getrgb(value)[:3]
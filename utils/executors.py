@@ -0,0 +1,59 @@
+"""
+Shared executors for offloading CPU-bound work from the event loop.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from config.settings import settings, setup_worker_logging
+
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+_thread_pool_pid: Optional[int] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Get the shared process pool, creating it on first use.
+    
+    Returns:
+        ProcessPoolExecutor with one worker per design agent
+    """
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.design_agent_count,
+            initializer=setup_worker_logging
+        )
+    return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the shared process pool if it was started."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+
+
+def get_thread_pool() -> ThreadPoolExecutor:
+    """
+    Get this process's thread pool for GIL-releasing image work.
+    
+    Collage generation runs inside process pool workers, so the pool is
+    keyed to the current PID; a pool inherited through fork has no threads
+    and is replaced.
+    
+    Returns:
+        ThreadPoolExecutor with one worker per CPU
+    """
+    global _thread_pool, _thread_pool_pid
+    if _thread_pool is None or _thread_pool_pid != os.getpid():
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            thread_name_prefix="image"
+        )
+        _thread_pool_pid = os.getpid()
+    return _thread_pool
@@ -0,0 +1,25 @@
+"""
+Layout geometry helpers shared by agents and services.
+"""
+
+import math
+from functools import lru_cache
+from typing import Tuple
+
+
+@lru_cache(maxsize=256)
+def grid_dimensions(num_images: int) -> Tuple[int, int]:
+    """
+    Calculate the smallest near-square grid that fits a number of images.
+    
+    Args:
+        num_images: Number of images to place (must be positive)
+        
+    Returns:
+        Grid dimensions (columns, rows)
+    """
+    cols = math.isqrt(num_images)
+    if cols * cols < num_images:
+        cols += 1
+    rows = -(-num_images // cols)
+    return cols, rows